@@ -73,8 +73,10 @@ class ZebraService {
         reject(new Error('Command timeout'));
       }, 10000);
 
+      // Zamknięcie strony zapisu po komendzie - drukarka odsyła odpowiedzi i zamyka
+      // połączenie w każdym trybie, także gdy komenda nie ma odpowiedzi
       client.connect(printer.port, printer.host, () => {
-        client.write(command);
+        client.end(command);
       });
 
       client.on('data', (data) => {
@@ -101,11 +103,22 @@ class ZebraService {
       if (!printer) throw new Error(`Unknown printer: ${printerId}`);
 
       const webUrl = `http://${printer.host}:${printer.webPort}/api/status`;
-      const response = await axios.get(webUrl, { timeout: 5000 });
+      // Warunkowy GET - przy niezmienionym stanie mock odpowiada 304 bez treści
+      const headers = printer.statusEtag ? { 'If-None-Match': printer.statusEtag } : {};
+      const response = await axios.get(webUrl, {
+        timeout: 5000,
+        headers,
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+      });
+
+      if (response.status !== 304) {
+        printer.statusEtag = response.headers.etag;
+        printer.lastStatus = response.data;
+      }
 
       return {
         success: true,
-        status: response.data
+        status: printer.lastStatus
       };
     } catch (error) {
       return {
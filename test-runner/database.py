@@ -0,0 +1,135 @@
+# test-runner/database.py
+# Bezpośredni dostęp testów do bazy WAPROMAG: ograniczona pula połączeń pymssql i zapytania z parametrami
+import queue
+import threading
+from contextlib import contextmanager
+
+import pymssql
+
+DEFAULT_POOL_SIZE = 4
+# Wiersze pobierane jednym fetchmany przy iteracji po dużych wynikach
+DEFAULT_FETCH_BATCH_SIZE = 500
+
+TABLE_EXISTS_QUERY = "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = %s"
+
+
+def quote_identifier(name):
+    """Nazwa tabeli w nawiasach kwadratowych jak QUOTENAME - identyfikator nie może być parametrem zapytania"""
+    return '[' + name.replace(']', ']]') + ']'
+
+
+class Database:
+    """Pula najwyżej pool_size połączeń pymssql współdzielona przez testy
+
+    Logowanie do serwera odbywa się raz na połączenie, a nie przy każdym
+    zapytaniu, więc pomiary czasu w testach obejmują samo zapytanie.
+    Połączenie, na którym wystąpił błąd lub porzucono nieodczytany wynik,
+    jest zamykane zamiast wracać do puli.
+    """
+
+    def __init__(self, config, timeout=10):
+        self.config = config
+        self.timeout = timeout
+        self.pool_size = config.get('pool_size', DEFAULT_POOL_SIZE)
+        self.fetch_batch_size = config.get('fetch_batch_size', DEFAULT_FETCH_BATCH_SIZE)
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._idle = queue.LifoQueue()
+        self.connections_opened = 0
+
+    def _connect(self):
+        conn = pymssql.connect(
+            server=self.config['host'],
+            port=str(self.config['port']),
+            user=self.config['username'],
+            password=self.config['password'],
+            database=self.config['database'],
+            login_timeout=self.timeout,
+            timeout=self.timeout
+        )
+        self.connections_opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection available within {self.timeout}s")
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            yield conn
+        except BaseException:
+            # Także GeneratorExit z przerwanej iteracji iter_rows - wynik nie został odczytany do końca
+            if conn is not None:
+                conn.close()
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def warm(self, count=1):
+        """Otwiera połączenia z wyprzedzeniem, żeby logowanie nie wliczało się do pierwszego zapytania
+
+        Każde przygotowywane połączenie zajmuje wolny slot jak w connection(),
+        więc razem z wypożyczonymi otwartych jest najwyżej pool_size.
+        """
+        slots = 0
+        ready = []
+        try:
+            while slots < min(count, self.pool_size) and self._slots.acquire(blocking=False):
+                slots += 1
+                try:
+                    ready.append(self._idle.get_nowait())
+                except queue.Empty:
+                    ready.append(self._connect())
+        finally:
+            for conn in ready:
+                self._idle.put(conn)
+            for _ in range(slots):
+                self._slots.release()
+
+    def iter_rows(self, sql, params=None, batch_size=None):
+        """Wiersze wyniku pobierane partiami fetchmany - duży wynik nie trafia do pamięci w całości"""
+        batch_size = batch_size or self.fetch_batch_size
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            cursor.close()
+
+    def fetch_all(self, sql, params=None):
+        return list(self.iter_rows(sql, params))
+
+    def scalar(self, sql, params=None):
+        """Pierwsza kolumna pierwszego wiersza (None dla pustego wyniku)"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+            # Reszta wyniku odczytana, żeby połączenie mogło wrócić do puli
+            cursor.fetchall()
+            cursor.close()
+        return row[0] if row else None
+
+    def table_exists(self, table):
+        return bool(self.scalar(TABLE_EXISTS_QUERY, (table,)))
+
+    def count_rows(self, table):
+        if not self.table_exists(table):
+            raise ValueError(f"Unknown table: {table}")
+        return self.scalar(f"SELECT COUNT(*) FROM {quote_identifier(table)}")
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
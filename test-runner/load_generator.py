@@ -0,0 +1,317 @@
+# test-runner/load_generator.py
+# Generator obciążenia w otwartej pętli: stałe tempo żądań z rampą, histogramy opóźnień i progi z test_config.yaml
+import argparse
+import json
+import math
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+CONFIG_FILE = Path(__file__).resolve().parent / 'config' / 'test_config.yaml'
+
+PERCENTILES = {'p50': 50.0, 'p95': 95.0, 'p99': 99.0, 'p999': 99.9}
+DEFAULT_PERCENTILE = 'p99'
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_STAGES = [{'duration': 10, 'rate': 5}]
+
+
+class LatencyHistogram:
+    """Histogram opóźnień o stałej precyzji względnej, jak HdrHistogram
+
+    Wartości w mikrosekundach trafiają do kubełków (przesunięcie, podkubełek):
+    każdy przedział od 2^n do 2^(n+1) dzieli się na 2^(significant_bits-1)
+    podkubełków, więc błąd percentyla nie przekracza 2^-(significant_bits-1)
+    wartości (0,8% dla 8 bitów) niezależnie od jej wielkości, a pamięć zależy
+    od rozpiętości opóźnień, nie od liczby żądań.
+    """
+
+    def __init__(self, significant_bits=8):
+        self.significant_bits = significant_bits
+        self.counts = {}
+        self.count = 0
+        self.max = 0
+
+    def record(self, seconds):
+        value = max(int(seconds * 1_000_000), 0)
+        shift = max(value.bit_length() - self.significant_bits, 0)
+        bucket = (shift, value >> shift)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """Górna granica kubełka z percent% wartości (sekundy); None dla pustego histogramu"""
+        if not self.count:
+            return None
+        rank = max(math.ceil(percent / 100 * self.count), 1)
+        seen = 0
+        # Kolejność (przesunięcie, podkubełek) to kolejność rosnących wartości
+        for (shift, sub_bucket), count in sorted(self.counts.items()):
+            seen += count
+            if seen >= rank:
+                return min(((sub_bucket + 1) << shift) - 1, self.max) / 1_000_000
+        return self.max / 1_000_000
+
+
+class TargetResult:
+    """Wynik obciążenia jednego celu; opóźnienia liczone od zaplanowanego czasu wysłania"""
+
+    def __init__(self, name):
+        self.name = name
+        self.histogram = LatencyHistogram()
+        self.scheduled = 0
+        self.errors = 0
+        # Żądania niewysłane, bo max_in_flight było zajęte - objaw nasycenia
+        self.dropped = 0
+        self.duration = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def record(self, latency, error=None):
+        with self._lock:
+            if error is None:
+                self.histogram.record(latency)
+            else:
+                self.errors += 1
+                self.last_error = error
+
+    @property
+    def error_rate(self):
+        if not self.scheduled:
+            return 0.0
+        return (self.errors + self.dropped) / self.scheduled
+
+    def to_dict(self):
+        result = {
+            'target': self.name,
+            'scheduled': self.scheduled,
+            'completed': self.histogram.count,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'error_rate': self.error_rate,
+            'throughput': self.histogram.count / self.duration if self.duration else 0.0,
+            'max': self.histogram.max / 1_000_000,
+            'last_error': self.last_error
+        }
+        for name, percent in PERCENTILES.items():
+            result[name] = self.histogram.percentile(percent)
+        return result
+
+
+def arrival_times(stages):
+    """Zaplanowane czasy wysłania (s od startu) dla etapów {duration, rate}
+
+    Tempo w etapie zmienia się liniowo od tempa poprzedniego etapu do rate
+    (pierwszy etap ma stałe tempo). Czas k-tego żądania w etapie to
+    rozwiązanie N(t) = k, gdzie N(t) to całka tempa - bez dryfu z zaokrągleń.
+    """
+    offset = 0.0
+    previous_rate = stages[0]['rate'] if stages else 0
+    for stage in stages:
+        duration, rate = stage['duration'], stage['rate']
+        if duration <= 0:
+            previous_rate = rate
+            continue
+        # N(t) = a*t^2 + b*t
+        a = (rate - previous_rate) / (2 * duration)
+        b = previous_rate
+        for k in range(1, int(a * duration ** 2 + b * duration) + 1):
+            if a:
+                t = (-b + math.sqrt(b * b + 4 * a * k)) / (2 * a)
+            else:
+                t = k / b
+            yield offset + t
+        offset += duration
+        previous_rate = rate
+
+
+def run_target(name, request, stages, max_in_flight):
+    """Otwarta pętla: żądania wysyłane według planu niezależnie od czasu odpowiedzi poprzednich"""
+    result = TargetResult(name)
+    slots = threading.BoundedSemaphore(max_in_flight)
+
+    def fire(scheduled):
+        try:
+            request()
+            error = None
+        except Exception as e:
+            error = str(e)
+        finally:
+            slots.release()
+        # Od zaplanowanego, nie faktycznego wysłania - opóźnienie generatora też jest widoczne
+        result.record(time.perf_counter() - scheduled, error)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for offset in arrival_times(stages):
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            result.scheduled += 1
+            if not slots.acquire(blocking=False):
+                result.dropped += 1
+                continue
+            executor.submit(fire, scheduled)
+    result.duration = time.perf_counter() - started
+    return result
+
+
+def build_targets(config, session):
+    """Cele obciążenia z sekcji load_test.targets: {nazwa: funkcja wysyłająca jedno żądanie}"""
+    base_url = f"{config['endpoints']['rpi_server'].rstrip('/')}/api"
+    timeout = config['timeouts']['response']
+    targets = {}
+
+    for name, options in config['load_test']['targets'].items():
+        kind = options.get('kind', name)
+        if kind == 'sql_query':
+            payload = {'database': options.get('database', 'wapromag'), 'query': options['query']}
+
+            def request(payload=payload):
+                response = session.post(f"{base_url}/sql/query", json=payload, timeout=timeout)
+                response.raise_for_status()
+        elif kind == 'zebra_command':
+            payload = {'printerId': options['printer'], 'command': options.get('command', '~HS')}
+
+            def request(payload=payload):
+                response = session.post(f"{base_url}/zebra/command", json=payload, timeout=timeout)
+                response.raise_for_status()
+                if response.json().get('success') is not True:
+                    raise RuntimeError(f"Command failed: {response.text[:100]}")
+        elif kind == 'raw_socket':
+            printer = config['printers'][options['printer']]
+            address = (printer['host'], printer['socket_port'])
+            command = options.get('command', '~HS').encode('utf-8')
+
+            def request(address=address, command=command):
+                raw_socket_request(address, command, timeout)
+        else:
+            raise ValueError(f"Unknown load target kind: {kind}")
+        targets[name] = request
+    return targets
+
+
+def raw_socket_request(address, command, timeout):
+    """Jedno połączenie z portem 9100 - komenda i odpowiedź do pierwszego końca linii"""
+    with socket.create_connection(address, timeout=timeout) as sock:
+        sock.sendall(command)
+        response = b''
+        while not response.endswith(b'\n'):
+            data = sock.recv(4096)
+            if not data:
+                break
+            response += data
+    if not response:
+        raise ConnectionError(f"No response from {address[0]}:{address[1]}")
+
+
+def run_load_tests(config, stages=None, targets=None):
+    """Obciąża równocześnie wybrane cele (domyślnie wszystkie); zwraca {nazwa: TargetResult}"""
+    load = config['load_test']
+    stages = stages or load.get('stages', DEFAULT_STAGES)
+    max_in_flight = load.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_in_flight)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    requests_by_target = build_targets(config, session)
+    names = targets or list(requests_by_target)
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            futures = {
+                name: executor.submit(run_target, name, requests_by_target[name], stages, max_in_flight)
+                for name in names
+            }
+            for name, future in futures.items():
+                results[name] = future.result()
+    finally:
+        session.close()
+    return results
+
+
+def check_thresholds(results, config):
+    """Porównuje wyniki z performance_thresholds; zwraca listę przekroczeń (pusta - w normie)"""
+    thresholds = config['performance_thresholds']
+    load = config['load_test']
+    percentile = load.get('percentile', DEFAULT_PERCENTILE)
+    violations = []
+
+    for name, result in results.items():
+        summary = result.to_dict()
+        success_rate = (1 - result.error_rate) * 100
+        if success_rate < thresholds['min_success_rate']:
+            violations.append(
+                f"{name}: success rate {success_rate:.1f}% < {thresholds['min_success_rate']}% "
+                f"(errors {result.errors}, dropped {result.dropped}, last error: {result.last_error})"
+            )
+        limit_name = load['targets'][name].get('threshold', 'max_response_time')
+        latency = summary[percentile]
+        if latency is not None and latency > thresholds[limit_name]:
+            violations.append(f"{name}: {percentile} {latency:.3f}s > {limit_name} {thresholds[limit_name]}s")
+    return violations
+
+
+def parse_stage(value):
+    try:
+        duration, rate = value.split(':')
+        return {'duration': float(duration), 'rate': float(rate)}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Stage must be DURATION:RATE, got {value!r}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Open-loop load test against rpi-server and printers')
+    parser.add_argument('--config', default=str(CONFIG_FILE), help='Test configuration YAML')
+    parser.add_argument('--target', action='append', help='Target from load_test.targets (default: all)')
+    parser.add_argument(
+        '--stage', action='append', type=parse_stage,
+        help='DURATION:RATE stage in seconds and requests/s, repeatable (default: load_test.stages)'
+    )
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    return parser.parse_args()
+
+
+# Main execution
+if __name__ == '__main__':
+    args = parse_args()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    results = run_load_tests(config, args.stage, args.target)
+    violations = check_thresholds(results, config)
+    if args.json:
+        print(json.dumps({
+            'results': [result.to_dict() for result in results.values()],
+            'violations': violations
+        }, indent=2))
+    else:
+        print(f"{'target':<16}{'sent':>8}{'errors':>8}{'dropped':>8}{'req/s':>9}"
+              f"{'p50':>9}{'p95':>9}{'p99':>9}{'p999':>9}{'max':>9}  (ms)")
+        for result in results.values():
+            row = result.to_dict()
+            latencies = ''.join(
+                f"{row[key] * 1000:>9.1f}" if row[key] is not None else f"{'-':>9}"
+                for key in (*PERCENTILES, 'max')
+            )
+            print(f"{result.name:<16}{row['scheduled']:>8}{row['errors']:>8}{row['dropped']:>8}"
+                  f"{row['throughput']:>9.1f}{latencies}")
+        for violation in violations:
+            print(f"THRESHOLD EXCEEDED - {violation}")
+    sys.exit(1 if violations else 0)
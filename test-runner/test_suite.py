@@ -1,9 +1,12 @@
 # test-runner/test_suite.py
 import sys
 import os
-import pytest
+import socket
+import subprocess
+import time
 import json
 import yaml
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 import logging
 from pathlib import Path
@@ -20,6 +23,15 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+TESTS_DIR = Path('tests')
+# Czasy wykonania plików testów z poprzedniego uruchomienia - podstawa podziału na shardy
+DURATIONS_FILE = 'test_durations.json'
+# Shard plików testów spoza sekcji test_categories
+UNCATEGORIZED_SHARD = 'other'
+SHARD_MODES = ('category', 'duration')
+# Łączny limit czasu raportu zdrowia, gdy konfiguracja nie podaje health.deadline
+DEFAULT_HEALTH_DEADLINE = 15
+
 
 class TestSuiteRunner:
     def __init__(self):
@@ -55,6 +67,10 @@ class TestSuiteRunner:
                 'response': 30,
                 'long_operation': 60
             },
+            'health': {
+                'deadline': DEFAULT_HEALTH_DEADLINE,
+                'http_paths': {'rpi_server': '/api/health'}
+            },
             'test_data': {
                 'test_product_code': 'TEST001',
                 'test_contractor_code': 'TESTK001',
@@ -67,25 +83,27 @@ class TestSuiteRunner:
         logger.info("🧪 Rozpoczynanie testów WAPRO Network Mock")
 
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-        # Argumenty dla pytest
-        pytest_args = [
-            'tests/',
-            '-v',
-            '--tb=short',
-            f'--html=reports/test_report_{timestamp}.html',
-            '--self-contained-html',
-            f'--json-report=reports/test_results_{timestamp}.json',
-            '--json-report-summary'
-        ]
-
-        # Dodatkowe opcje w zależności od środowiska
-        if self.config.get('environment') == 'ci':
-            pytest_args.extend(['--maxfail=5', '--strict-markers'])
+        parallel = self.config.get('parallel_execution', {})
+        max_workers = max(int(parallel.get('max_workers', 1)), 1)
 
         try:
-            # Uruchomienie testów
-            exit_code = pytest.main(pytest_args)
+            shards = self.build_shards(
+                parallel.get('shard_by', 'category'),
+                max_workers,
+                parallel.get('exclusive_groups')
+            )
+            logger.info(f"Shardy testów ({max_workers} równolegle): {', '.join(name for name, _ in shards)}")
+
+            # Każdy shard to osobny proces pytest - oczekiwanie na timeouty sieciowe nakłada się w czasie
+            started = time.monotonic()
+            timeout_multiplier = parallel.get('timeout_multiplier', 1)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self.run_shard, timestamp, name, paths, timeout_multiplier)
+                    for name, paths in shards
+                ]
+                shard_results = [future.result() for future in futures]
+            exit_code = self.merge_shard_reports(timestamp, shard_results, time.monotonic() - started)
 
             # Generowanie dodatkowych raportów
             self.generate_summary_report(timestamp)
@@ -102,6 +120,169 @@ class TestSuiteRunner:
             logger.error(f"❌ Błąd podczas uruchamiania testów: {e}")
             return 1
 
+    def build_shards(self, shard_by, max_workers, exclusive_groups=None):
+        """Dzieli pliki testów na shardy: [(nazwa, [ścieżki])]
+
+        category - jeden shard na kategorię z test_categories (plus shard
+        z pozostałymi plikami), najdłuższe według zapisanych czasów najpierw;
+        duration - max_workers shardów o zbliżonej sumie zapisanych czasów.
+        Pliki z jednej grupy exclusive_groups (zmieniające stan tych samych
+        usług) zawsze trafiają do jednego shardu i nie biegną równolegle.
+        """
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f"Unknown shard_by mode: {shard_by} (expected one of {', '.join(SHARD_MODES)})")
+
+        files = sorted(path.name for path in TESTS_DIR.glob('test_*.py'))
+        durations = self.load_durations()
+        # Plik bez zapisanego czasu - średnia z pozostałych
+        default = sum(durations.values()) / len(durations) if durations else 1.0
+
+        def estimate(names):
+            return sum(durations.get(name, default) for name in names)
+
+        groups = []
+        grouped = set()
+        for group, names in (exclusive_groups or {}).items():
+            names = [name for name in names if name in files and name not in grouped]
+            grouped.update(names)
+            if names:
+                groups.append((group, names))
+
+        if shard_by == 'duration':
+            # Najdłuższe grupy i pliki najpierw, każde do shardu o najmniejszej dotychczasowej sumie
+            units = [names for _, names in groups] + [[name] for name in files if name not in grouped]
+            bins = [[] for _ in range(min(max_workers, len(units)))]
+            for names in sorted(units, key=estimate, reverse=True):
+                min(bins, key=estimate).extend(names)
+            shards = [(f'shard{index + 1}', names) for index, names in enumerate(bins) if names]
+        else:
+            shards = list(groups)
+            assigned = set(grouped)
+            for category, names in (self.config.get('test_categories') or {}).items():
+                names = [name for name in names if name in files and name not in assigned]
+                assigned.update(names)
+                if names:
+                    shards.append((category, names))
+            remaining = [name for name in files if name not in assigned]
+            if remaining:
+                shards.append((UNCATEGORIZED_SHARD, remaining))
+            shards.sort(key=lambda shard: estimate(shard[1]), reverse=True)
+
+        return [(name, [str(TESTS_DIR / file) for file in names]) for name, names in shards]
+
+    def load_durations(self):
+        durations_file = self.results_dir / DURATIONS_FILE
+        if not durations_file.exists():
+            return {}
+        try:
+            with open(durations_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {durations_file}: {e}")
+            return {}
+
+    def shard_printers(self, paths):
+        """Drukarki shardu: przydzielone w group_printers jego grupom, a bez takiej grupy wszystkie nieprzydzielone"""
+        parallel = self.config.get('parallel_execution', {})
+        groups = parallel.get('exclusive_groups') or {}
+        files = {Path(path).name for path in paths}
+
+        assigned = set()
+        printers = []
+        for group, printer_ids in (parallel.get('group_printers') or {}).items():
+            assigned.update(printer_ids)
+            if files.intersection(groups.get(group, [])):
+                printers.extend(printer_ids)
+        if printers:
+            return printers
+        return [printer_id for printer_id in self.config.get('printers', {}) if printer_id not in assigned]
+
+    def run_shard(self, timestamp, name, paths, timeout_multiplier):
+        """Uruchamia jeden shard w osobnym procesie pytest; zwraca (nazwa, kod wyjścia, raport JSON, czas)"""
+        report_path = self.results_dir / f'test_results_{timestamp}_{name}.json'
+        pytest_args = [
+            sys.executable, '-m', 'pytest',
+            *paths,
+            '-v',
+            '--tb=short',
+            f'--html={self.results_dir}/test_report_{timestamp}_{name}.html',
+            '--self-contained-html',
+            # Bez --json-report-summary - scalanie i kategorie podsumowania potrzebują wyników testów
+            '--json-report',
+            f'--json-report-file={report_path}'
+        ]
+
+        # Dodatkowe opcje w zależności od środowiska
+        if self.config.get('environment') == 'ci':
+            pytest_args.extend(['--maxfail=5', '--strict-markers'])
+
+        # Równoległe shardy obciążają wspólne usługi - testy wydłużają timeouty o ten mnożnik
+        printers = self.shard_printers(paths)
+        env = dict(os.environ, TEST_TIMEOUT_MULTIPLIER=str(timeout_multiplier), TEST_PRINTERS=','.join(printers))
+
+        logger.info(f"▶️ Shard {name} (drukarki: {', '.join(printers) or 'brak'}): {' '.join(paths)}")
+        started = time.monotonic()
+        result = subprocess.run(pytest_args, env=env, capture_output=True, text=True)
+        duration = time.monotonic() - started
+
+        # Wyjście shardu w całości, żeby logi równoległych procesów się nie przeplatały
+        log_path = Path('logs') / f'shard_{timestamp}_{name}.log'
+        log_path.write_text(result.stdout + result.stderr, encoding='utf-8')
+        logger.info(f"⏹️ Shard {name}: kod {result.returncode}, {duration:.1f}s (log: {log_path})")
+
+        return name, result.returncode, report_path, duration
+
+    def merge_shard_reports(self, timestamp, shard_results, duration):
+        """Łączy raporty JSON shardów w test_results_<timestamp>.json; zwraca łączny kod wyjścia"""
+        merged = {
+            'created': time.time(),
+            'duration': duration,
+            'exitcode': 0,
+            'root': str(Path.cwd()),
+            'summary': {},
+            'tests': [],
+            'shards': []
+        }
+        exit_codes = []
+        file_durations = {}
+
+        for name, exit_code, report_path, shard_duration in shard_results:
+            merged['shards'].append({'name': name, 'exitcode': exit_code, 'duration': shard_duration})
+            # 5 - shard bez testów (np. wszystkie odznaczone), nie błąd całego uruchomienia
+            if exit_code != 5:
+                exit_codes.append(exit_code)
+            if not report_path.exists():
+                logger.error(f"Shard {name} produced no JSON report")
+                continue
+
+            with open(report_path, 'r') as f:
+                report = json.load(f)
+            for key, value in report.get('summary', {}).items():
+                if isinstance(value, (int, float)):
+                    merged['summary'][key] = merged['summary'].get(key, 0) + value
+            for test in report.get('tests', []):
+                test['shard'] = name
+                merged['tests'].append(test)
+                file_name = Path(test['nodeid'].split('::')[0]).name
+                file_durations[file_name] = file_durations.get(file_name, 0) + sum(
+                    test.get(stage, {}).get('duration', 0) for stage in ('setup', 'call', 'teardown')
+                )
+
+        merged['summary'].setdefault('total', len(merged['tests']))
+        # Czas ściany całego uruchomienia, nie suma czasów shardów
+        merged['summary']['duration'] = duration
+        merged['exitcode'] = max(exit_codes) if exit_codes else 5
+
+        with open(self.results_dir / f'test_results_{timestamp}.json', 'w') as f:
+            json.dump(merged, f, indent=2)
+        if file_durations:
+            durations = self.load_durations()
+            durations.update(file_durations)
+            with open(self.results_dir / DURATIONS_FILE, 'w') as f:
+                json.dump(durations, f, indent=2)
+
+        return merged['exitcode']
+
     def generate_summary_report(self, timestamp):
         """Generuje podsumowanie wyników testów"""
         try:
@@ -161,11 +342,172 @@ class TestSuiteRunner:
                 json.dump(summary, f, indent=2)
 
             logger.info(
-                f"🏥 Stan zdrowia systemu: {health_percentage:.1f}% ({healthy_components}/{total_components} komponentów)")
+                f"📊 Podsumowanie: {summary['passed']}/{summary['total_tests']} testów zaliczonych "
+                f"({summary['success_rate']:.1f}%) w {summary['duration']:.1f}s")
+
+        except Exception as e:
+            logger.error(f"Błąd podczas generowania podsumowania: {e}")
+
+    def generate_health_report(self):
+        """Generuje raport zdrowia systemu
+
+        Wszystkie sondy (endpoints, printers i baza danych z konfiguracji)
+        działają równolegle pod jednym limitem health.deadline - zdegradowane
+        środowisko zgłaszane jest po czasie najwolniejszej sondy, a nie po
+        sumie timeoutów. Sonda, która nie zdążyła, jest oznaczana jako
+        unhealthy z błędem 'Deadline exceeded'.
+        """
+        try:
+            health = self.config.get('health', {})
+            deadline = health.get('deadline', DEFAULT_HEALTH_DEADLINE)
+            timeout = min(self.config['timeouts']['connection'], deadline)
+            probes = self.build_health_probes(health.get('http_paths', {}), timeout)
+
+            health_data = {
+                'timestamp': datetime.now().isoformat(),
+                'deadline': deadline,
+                'components': {}
+            }
+
+            started = time.monotonic()
+            executor = ThreadPoolExecutor(max_workers=max(len(probes), 1))
+            futures = {
+                name: executor.submit(run_probe, kind, endpoint, probe, timeout)
+                for name, (kind, endpoint, probe) in probes.items()
+            }
+            wait(futures.values(), timeout=deadline)
+            # Nie czekamy na sondy po terminie - każda i tak kończy się po własnym timeoucie
+            executor.shutdown(wait=False)
+
+            for name, future in futures.items():
+                if future.done():
+                    health_data['components'][name] = future.result()
+                else:
+                    kind, endpoint, _ = probes[name]
+                    health_data['components'][name] = {
+                        'status': 'unhealthy',
+                        'kind': kind,
+                        'endpoint': endpoint,
+                        'latency': None,
+                        'error': 'Deadline exceeded'
+                    }
+            health_data['duration'] = time.monotonic() - started
+
+            # Obliczenie ogólnego stanu zdrowia
+            healthy_components = len([c for c in health_data['components'].values() if c['status'] == 'healthy'])
+            total_components = len(health_data['components'])
+            health_percentage = (healthy_components / total_components * 100) if total_components > 0 else 0
+            if healthy_components == total_components:
+                overall_status = 'HEALTHY'
+            elif healthy_components > 0:
+                overall_status = 'DEGRADED'
+            else:
+                overall_status = 'UNHEALTHY'
+            health_data['summary'] = {
+                'overall_status': overall_status,
+                'healthy': healthy_components,
+                'total': total_components,
+                'health_percentage': health_percentage
+            }
+
+            # Zapisanie raportu zdrowia
+            with open(self.results_dir / 'health_report.json', 'w') as f:
+                json.dump(health_data, f, indent=2)
+
+            logger.info(
+                f"🏥 Stan zdrowia systemu: {health_percentage:.1f}% ({healthy_components}/{total_components} "
+                f"komponentów) w {health_data['duration']:.1f}s")
 
         except Exception as e:
             logger.error(f"Błąd podczas generowania raportu zdrowia: {e}")
 
+    def build_health_probes(self, http_paths, timeout):
+        """Sondy z konfiguracji: {nazwa: (rodzaj, endpoint, funkcja bez argumentów)}"""
+        probes = {}
+
+        # Drukarki odpytywane ~HS - odpowiadający port to jeszcze nie działający mock
+        for printer_id, printer in (self.config.get('printers') or {}).items():
+            endpoint = f"{printer['host']}:{printer['socket_port']}"
+            probes[printer_id] = (
+                'printer', endpoint,
+                lambda printer=printer: probe_printer(printer['host'], printer['socket_port'], timeout)
+            )
+
+        database = self.config.get('database')
+        if database:
+            probes['database'] = (
+                'database', f"{database['host']}:{database['port']}",
+                lambda: probe_database(database, timeout)
+            )
+
+        # Endpointy z adresem URL sprawdzane przez HTTP GET, pozostałe (host:port) połączeniem TCP;
+        # porty drukarek i bazy mają już dokładniejsze sondy powyżej
+        covered = {endpoint for _, endpoint, _ in probes.values()}
+        for name, endpoint in self.config.get('endpoints', {}).items():
+            if '://' in endpoint:
+                url = endpoint.rstrip('/') + http_paths.get(name, '/')
+                probes[name] = ('http', url, lambda url=url: probe_http(url, timeout))
+            elif endpoint not in covered:
+                host, port = endpoint.rsplit(':', 1)
+                probes[name] = ('tcp', endpoint, lambda host=host, port=int(port): probe_tcp(host, port, timeout))
+        return probes
+
+
+def run_probe(kind, endpoint, probe, timeout):
+    """Wykonuje sondę i mierzy jej czas; wyjątek oznacza komponent niezdrowy"""
+    started = time.monotonic()
+    component = {'kind': kind, 'endpoint': endpoint}
+    try:
+        component['details'] = probe()
+        component['status'] = 'healthy'
+    except Exception as e:
+        component['status'] = 'unhealthy'
+        component['error'] = str(e)
+    component['latency'] = time.monotonic() - started
+    return component
+
+
+def probe_http(url, timeout):
+    import requests
+
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    if 'application/json' in response.headers.get('Content-Type', ''):
+        return response.json()
+    return {'status_code': response.status_code}
+
+
+def probe_tcp(host, port, timeout):
+    with socket.create_connection((host, port), timeout=timeout):
+        return None
+
+
+def probe_printer(host, port, timeout):
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(b'~HS')
+        sock.shutdown(socket.SHUT_WR)
+        response = b''
+        while not response.endswith(b'\n'):
+            data = sock.recv(4096)
+            if not data:
+                break
+            response += data
+    response = response.decode('utf-8', errors='ignore').strip()
+    if not response.startswith('STATUS:'):
+        raise ValueError(f"Unexpected ~HS response: {response[:100]!r}")
+    return response
+
+
+def probe_database(config, timeout):
+    from database import Database
+
+    database = Database(dict(config, pool_size=1), timeout=timeout)
+    try:
+        database.scalar("SELECT 1")
+    finally:
+        database.close()
+    return {'database': config['database']}
+
 
 def main():
     """Główna funkcja uruchamiająca testy"""
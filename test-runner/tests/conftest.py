@@ -0,0 +1,102 @@
+# test-runner/tests/conftest.py
+# Wspólne fixture'y testów: konfiguracja z config/test_config.yaml i sesja HTTP z pulą połączeń
+import functools
+import os
+from pathlib import Path
+
+import pytest
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+# TEST_CONFIG wskazuje konfigurację innego środowiska niż domyślne docker-compose
+CONFIG_FILE = Path(__file__).resolve().parent.parent / 'config' / 'test_config.yaml'
+
+DEFAULT_POOL_CONNECTIONS = 8
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class PooledSession(requests.Session):
+    """Sesja HTTP współdzielona przez testy - połączenia keep-alive z puli zamiast nowego TCP na żądanie
+
+    Timeouty podawane w testach mnożone są przez timeout_multiplier
+    (TEST_TIMEOUT_MULTIPLIER, ustawiany przez test_suite.py dla równoległych shardów).
+    """
+
+    def __init__(self, pool_connections, pool_maxsize, timeout_multiplier=1.0):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+        self.timeout_multiplier = timeout_multiplier
+
+    def request(self, method, url, **kwargs):
+        timeout = kwargs.get('timeout')
+        if timeout is not None:
+            kwargs['timeout'] = timeout * self.timeout_multiplier
+        return super().request(method, url, **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def load_test_config():
+    """Konfiguracja testów wczytywana raz na całe uruchomienie (także przy zbieraniu testów)"""
+    with open(os.getenv('TEST_CONFIG', CONFIG_FILE), 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def visible_printers():
+    """Drukarki z sekcji printers zawężone do TEST_PRINTERS - listy przydzielonej shardowi przez test_suite.py"""
+    printers = load_test_config()['printers']
+    selected = os.getenv('TEST_PRINTERS')
+    if not selected:
+        return printers
+    return {printer_id: printers[printer_id] for printer_id in selected.split(',') if printer_id in printers}
+
+
+def pytest_generate_tests(metafunc):
+    """Testy z argumentem printer_id uruchamiane są dla każdej widocznej drukarki z sekcji printers"""
+    if 'printer_id' in metafunc.fixturenames:
+        metafunc.parametrize('printer_id', list(visible_printers()))
+
+
+@pytest.fixture(scope="session")
+def test_config():
+    return load_test_config()
+
+
+@pytest.fixture(scope="session")
+def http(test_config):
+    """Sesja HTTP z pulą połączeń - używana zamiast requests.get/post"""
+    pool = test_config.get('http_pool', {})
+    session = PooledSession(
+        pool.get('pool_connections', DEFAULT_POOL_CONNECTIONS),
+        pool.get('pool_maxsize', DEFAULT_POOL_MAXSIZE),
+        float(os.getenv('TEST_TIMEOUT_MULTIPLIER', '1'))
+    )
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def rpi_base_url(test_config):
+    return f"{test_config['endpoints']['rpi_server'].rstrip('/')}/api"
+
+
+@pytest.fixture(scope="session")
+def zebra_printers():
+    return visible_printers()
+
+
+@pytest.fixture(scope="session")
+def db_config(test_config):
+    return test_config['database']
+
+
+@pytest.fixture(scope="session")
+def db(db_config, test_config):
+    """Pula połączeń do bazy (database.Database) - pymssql importowany tylko przez testy bazy"""
+    from database import Database
+
+    database = Database(db_config, timeout=test_config['timeouts']['connection'])
+    yield database
+    database.close()
@@ -1,18 +1,15 @@
 # test-runner/tests/test_integration.py
 import pytest
-import requests
 import time
 import json
 from datetime import datetime
 
+from load_generator import check_thresholds, run_load_tests
+
 
 class TestWaproIntegration:
     """Testy integracyjne całego systemu WAPRO"""
 
-    @pytest.fixture(scope="class")
-    def rpi_base_url(self):
-        return "http://rpi-server:8081/api"
-
     @pytest.fixture(scope="class")
     def test_data(self):
         return {
@@ -21,16 +18,21 @@ class TestWaproIntegration:
             'document_number': f'TEST/{int(time.time())}/2025'
         }
 
-    def test_full_system_health(self, rpi_base_url):
+    @pytest.fixture(scope="class")
+    def label_printer_id(self, zebra_printers):
+        # Pierwsza drukarka shardu - nie ta, której stan sprawdza test_zebra_mock.py
+        return next(iter(zebra_printers))
+
+    def test_full_system_health(self, http, rpi_base_url):
         """Test kompletnego stanu zdrowia systemu"""
-        response = requests.get(f"{rpi_base_url}/health/detailed", timeout=30)
+        response = http.get(f"{rpi_base_url}/health/detailed", timeout=30)
         assert response.status_code == 200
 
         health_report = response.json()
         assert 'summary' in health_report
         assert health_report['summary']['overall_status'] in ['HEALTHY', 'DEGRADED']
 
-    def test_database_to_printer_workflow(self, rpi_base_url, test_data):
+    def test_database_to_printer_workflow(self, http, rpi_base_url, test_data, label_printer_id):
         """Test przepływu danych od bazy danych do drukarki"""
 
         # 1. Pobierz produkt z bazy danych
@@ -39,7 +41,7 @@ class TestWaproIntegration:
             'query': 'SELECT TOP 1 ID, Kod, Nazwa, KodKreskowy FROM Produkty WHERE CzyAktywny = 1'
         }
 
-        response = requests.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
+        response = http.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
         assert response.status_code == 200
 
         sql_result = response.json()
@@ -62,17 +64,17 @@ class TestWaproIntegration:
 
         # 3. Wyślij etykietę do drukarki
         print_data = {
-            'printerId': 'zebra-1',
+            'printerId': label_printer_id,
             'command': zpl_label
         }
 
-        response = requests.post(f"{rpi_base_url}/zebra/command", json=print_data, timeout=20)
+        response = http.post(f"{rpi_base_url}/zebra/command", json=print_data, timeout=20)
         assert response.status_code == 200
 
         print_result = response.json()
         assert print_result['success'] is True
 
-    def test_printer_configuration_from_database(self, rpi_base_url):
+    def test_printer_configuration_from_database(self, http, rpi_base_url):
         """Test konfiguracji drukarek z bazy danych"""
 
         # Pobierz konfigurację drukarek z bazy
@@ -81,7 +83,7 @@ class TestWaproIntegration:
             'query': 'SELECT NazwaDrukarki, AdresIP, Port, ModelDrukarki FROM KonfiguracjaDrukarek WHERE CzyAktywna = 1'
         }
 
-        response = requests.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
+        response = http.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
         assert response.status_code == 200
 
         config_result = response.json()
@@ -99,13 +101,13 @@ class TestWaproIntegration:
             else:
                 continue
 
-            response = requests.get(f"{rpi_base_url}/zebra/test/{printer_id}", timeout=10)
+            response = http.get(f"{rpi_base_url}/zebra/test/{printer_id}", timeout=10)
             assert response.status_code == 200
 
             test_result = response.json()
             assert test_result['success'] is True
 
-    def test_document_creation_and_labeling(self, rpi_base_url, test_data):
+    def test_document_creation_and_labeling(self, http, rpi_base_url, test_data, label_printer_id):
         """Test tworzenia dokumentu i generowania etykiet"""
 
         # 1. Pobierz produkty do dokumentu
@@ -119,7 +121,7 @@ class TestWaproIntegration:
             '''
         }
 
-        response = requests.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
+        response = http.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
         assert response.status_code == 200
 
         products_result = response.json()
@@ -141,11 +143,11 @@ class TestWaproIntegration:
 
             # Wyślij do pierwszej drukarki
             print_data = {
-                'printerId': 'zebra-1',
+                'printerId': label_printer_id,
                 'command': label_zpl
             }
 
-            response = requests.post(f"{rpi_base_url}/zebra/command", json=print_data, timeout=15)
+            response = http.post(f"{rpi_base_url}/zebra/command", json=print_data, timeout=15)
             assert response.status_code == 200
 
             result = response.json()
@@ -154,13 +156,13 @@ class TestWaproIntegration:
             # Krótka pauza między etykietami
             time.sleep(1)
 
-    def test_multi_printer_load_balancing(self, rpi_base_url):
+    def test_multi_printer_load_balancing(self, http, rpi_base_url, zebra_printers):
         """Test rozłożenia obciążenia między drukarkami"""
 
-        # Test równoczesnego drukowania na obu drukarkach
+        # Test równoczesnego drukowania na wszystkich drukarkach shardu
         test_commands = [
-            ('zebra-1', '^XA^FO50,50^A0N,40,40^FDTest Printer 1^FS^XZ'),
-            ('zebra-2', '^XA^FO50,50^A0N,40,40^FDTest Printer 2^FS^XZ')
+            (printer_id, f'^XA^FO50,50^A0N,40,40^FDTest Printer {index}^FS^XZ')
+            for index, printer_id in enumerate(zebra_printers, start=1)
         ]
 
         import concurrent.futures
@@ -170,10 +172,10 @@ class TestWaproIntegration:
                 'printerId': printer_id,
                 'command': command
             }
-            response = requests.post(f"{rpi_base_url}/zebra/command", json=print_data, timeout=15)
+            response = http.post(f"{rpi_base_url}/zebra/command", json=print_data, timeout=15)
             return printer_id, response.status_code == 200, response.json().get('success', False)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(test_commands)) as executor:
             futures = [
                 executor.submit(send_print_command, printer_id, command)
                 for printer_id, command in test_commands
@@ -186,7 +188,7 @@ class TestWaproIntegration:
             assert status_ok, f"Błąd HTTP dla drukarki {printer_id}"
             assert success, f"Błąd drukowania dla drukarki {printer_id}"
 
-    def test_error_handling_and_recovery(self, rpi_base_url):
+    def test_error_handling_and_recovery(self, http, rpi_base_url, label_printer_id):
         """Test obsługi błędów i odzyskiwania"""
 
         # Test nieprawidłowego zapytania SQL
@@ -195,61 +197,33 @@ class TestWaproIntegration:
             'query': 'SELECT * FROM NonExistentTable'
         }
 
-        response = requests.post(f"{rpi_base_url}/sql/query", json=invalid_query, timeout=10)
+        response = http.post(f"{rpi_base_url}/sql/query", json=invalid_query, timeout=10)
         assert response.status_code == 500
 
         # Test nieprawidłowej komendy drukarki
         invalid_print = {
-            'printerId': 'zebra-1',
+            'printerId': label_printer_id,
             'command': ''  # Pusta komenda
         }
 
-        response = requests.post(f"{rpi_base_url}/zebra/command", json=invalid_print, timeout=10)
+        response = http.post(f"{rpi_base_url}/zebra/command", json=invalid_print, timeout=10)
         assert response.status_code == 400 or response.json().get('success') is False
 
         # Test że system nadal działa po błędach
-        response = requests.get(f"{rpi_base_url}/health", timeout=10)
+        response = http.get(f"{rpi_base_url}/health", timeout=10)
         assert response.status_code == 200
 
-    def test_performance_under_load(self, rpi_base_url):
-        """Test wydajności pod obciążeniem"""
-
-        import concurrent.futures
-        import time
-
-        def execute_quick_test():
-            start_time = time.time()
-
-            # Test bazy danych
-            query_data = {
-                'database': 'wapromag',
-                'query': 'SELECT COUNT(*) FROM Produkty'
-            }
-            response = requests.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=5)
-            db_success = response.status_code == 200
-
-            # Test drukarki
-            response = requests.get(f"{rpi_base_url}/zebra/test/zebra-1", timeout=5)
-            printer_success = response.status_code == 200
-
-            execution_time = time.time() - start_time
-            return db_success, printer_success, execution_time
-
-        # Wykonaj 10 równoczesnych testów
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(execute_quick_test) for _ in range(10)]
-            results = [future.result() for future in concurrent.futures.as_completed(futures)]
+    def test_performance_under_load(self, test_config):
+        """Test wydajności pod obciążeniem - stałe tempo żądań, percentyle i błędy względem progów"""
+        results = run_load_tests(test_config, stages=test_config['load_test']['pytest_stages'])
 
-        # Analiza wyników
-        db_success_count = sum(1 for db_ok, _, _ in results if db_ok)
-        printer_success_count = sum(1 for _, printer_ok, _ in results if printer_ok)
-        avg_execution_time = sum(exec_time for _, _, exec_time in results) / len(results)
+        for result in results.values():
+            assert result.histogram.count > 0, f"Brak udanych żądań dla {result.name}: {result.last_error}"
 
-        assert db_success_count >= 8, f"Zbyt mało udanych testów bazy danych: {db_success_count}/10"
-        assert printer_success_count >= 8, f"Zbyt mało udanych testów drukarek: {printer_success_count}/10"
-        assert avg_execution_time < 3.0, f"Średni czas wykonania zbyt długi: {avg_execution_time:.2f}s"
+        violations = check_thresholds(results, test_config)
+        assert not violations, "Przekroczone progi wydajności: " + "; ".join(violations)
 
-    def test_data_consistency_check(self, rpi_base_url):
+    def test_data_consistency_check(self, http, rpi_base_url):
         """Test spójności danych w systemie"""
 
         # Sprawdź spójność stanów magazynowych
@@ -263,7 +237,7 @@ class TestWaproIntegration:
             '''
         }
 
-        response = requests.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
+        response = http.post(f"{rpi_base_url}/sql/query", json=query_data, timeout=15)
         assert response.status_code == 200
 
         result = response.json()
@@ -277,11 +251,11 @@ class TestWaproIntegration:
                 assert abs(float(product_stock or 0) - float(warehouse_stock)) < 0.001, \
                     f"Niezgodność stanów dla produktu {product_code}"
 
-    def test_system_monitoring_integration(self, rpi_base_url):
+    def test_system_monitoring_integration(self, http, rpi_base_url):
         """Test integracji systemu monitorowania"""
 
         # Test diagnostyki
-        response = requests.get(f"{rpi_base_url}/diagnostic/full", timeout=30)
+        response = http.get(f"{rpi_base_url}/diagnostic/full", timeout=30)
         assert response.status_code == 200
 
         diagnostics = response.json()
@@ -290,7 +264,7 @@ class TestWaproIntegration:
         assert 'network' in diagnostics
 
         # Test generowania raportu
-        response = requests.get(f"{rpi_base_url}/diagnostic/report", timeout=30)
+        response = http.get(f"{rpi_base_url}/diagnostic/report", timeout=30)
         assert response.status_code == 200
 
         report = response.json()
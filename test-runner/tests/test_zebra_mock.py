@@ -0,0 +1,282 @@
+# test-runner/tests/test_zebra_mock.py
+import base64
+import binascii
+import pytest
+import socket
+import struct
+import time
+import zlib
+
+
+class TestZebraMockProtocol:
+    """Testy protokołu ZPL obsługiwanego przez mock drukarki"""
+
+    @pytest.fixture(scope="class")
+    def printer(self, zebra_printers):
+        # Pierwsza drukarka shardu - w test_suite.py przydzielona tej grupie na wyłączność
+        return next(iter(zebra_printers.values()))
+
+    def get_jobs_printed(self, http, printer):
+        response = http.get(
+            f"http://{printer['host']}:{printer['web_port']}/api/status",
+            timeout=10
+        )
+        assert response.status_code == 200
+        return response.json()['jobs_printed']
+
+    def send_raw(self, printer, chunks, delay=0.05):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(10)
+        try:
+            sock.connect((printer['host'], printer['socket_port']))
+            for chunk in chunks:
+                sock.sendall(chunk)
+                time.sleep(delay)
+            sock.shutdown(socket.SHUT_WR)
+
+            response = b''
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                response += data
+            return response.decode('utf-8', errors='ignore')
+        finally:
+            sock.close()
+
+    def test_format_split_across_packets(self, http, printer):
+        """Format ^XA...^XZ podzielony w dowolnych miejscach liczony jest jako jedno zadanie"""
+        label = b'^XA^FO50,50^A0N,50,50^FD' + b'X' * 4000 + b'^FS^BCN,100,Y,N,N^FD123456789^FS^XZ'
+        chunks = [label[i:i + 333] for i in range(0, len(label), 333)]
+
+        jobs_before = self.get_jobs_printed(http, printer)
+        response = self.send_raw(printer, chunks)
+
+        assert response.count('JOB COMPLETED') == 1
+        assert self.get_jobs_printed(http, printer) - jobs_before == 1
+
+    def test_host_command_split_across_packets(self, http, printer):
+        """Komenda hosta z parametrami podzielona między pakiety trafia do drukarki w całości"""
+        jobs_url = f"http://{printer['host']}:{printer['web_port']}/api/jobs"
+        response = self.send_raw(printer, [b'~HQE', b'S\n'])
+        assert response.strip()
+
+        job = http.get(jobs_url, params={'limit': 1}, timeout=10).json()['jobs'][0]
+        assert job['kind'] == 'host'
+        assert job['preview'] == '~HQES'
+
+    def test_multiple_formats_in_one_packet(self, http, printer):
+        """Każdy format w jednym pakiecie liczony jest dokładnie raz"""
+        batch = b''.join(
+            b'^XA^FO50,50^A0N,30,30^FDLabel %d^FS^XZ\n' % i for i in range(5)
+        )
+
+        jobs_before = self.get_jobs_printed(http, printer)
+        response = self.send_raw(printer, [batch])
+
+        assert response.count('JOB COMPLETED') == 5
+        assert self.get_jobs_printed(http, printer) - jobs_before == 5
+
+    def test_unknown_commands_counted(self, http, printer):
+        """Nieznane komendy są zliczane w statusie drukarki"""
+        status_url = f"http://{printer['host']}:{printer['web_port']}/api/status"
+        before = http.get(status_url, timeout=10).json()['unknown_commands'].get('QQ', 0)
+
+        response = self.send_raw(printer, [b'~QQ~HS'])
+        assert 'STATUS:' in response
+
+        after = http.get(status_url, timeout=10).json()['unknown_commands'].get('QQ', 0)
+        assert after - before == 1
+
+    def test_metrics_endpoint(self, http, printer):
+        """Endpoint /api/metrics zwraca metryki w formacie OpenMetrics"""
+        self.send_raw(printer, [b'~HS'])
+
+        response = http.get(
+            f"http://{printer['host']}:{printer['web_port']}/api/metrics",
+            timeout=10
+        )
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('application/openmetrics-text')
+
+        body = response.text
+        assert 'printer_available{' in body
+        assert 'zebra_commands_total{' in body and 'mnemonic="HS"' in body
+        assert 'zebra_command_duration_seconds_bucket{' in body
+        assert body.rstrip().endswith('# EOF')
+
+    def test_jobs_history_pagination(self, http, printer):
+        """Historia zadań /api/jobs jest stronicowana kursorem od najnowszych"""
+        self.send_raw(printer, [b'^XA^FO10,10^A0N,20,20^FDHistory %d^FS^XZ' % i for i in range(3)])
+
+        jobs_url = f"http://{printer['host']}:{printer['web_port']}/api/jobs"
+        first_page = http.get(jobs_url, params={'limit': 2}, timeout=10).json()
+        assert len(first_page['jobs']) == 2
+        assert first_page['jobs'][0]['id'] > first_page['jobs'][1]['id']
+        assert first_page['next_cursor'] is not None
+
+        second_page = http.get(
+            jobs_url,
+            params={'limit': 2, 'cursor': first_page['next_cursor']},
+            timeout=10
+        ).json()
+        assert second_page['jobs'][0]['id'] < first_page['jobs'][-1]['id']
+
+        job = first_page['jobs'][0]
+        assert len(job['digest']) == 32
+        assert job['size'] > 0
+
+    def test_fault_latency_injection(self, http, printer):
+        """Profil błędów /api/faults opóźnia odpowiedzi drukarki"""
+        faults_url = f"http://{printer['host']}:{printer['web_port']}/api/faults"
+        response = http.put(
+            faults_url,
+            json={'latency': {'distribution': 'fixed', 'mean': 0.5}},
+            timeout=10
+        )
+        assert response.status_code == 200
+
+        try:
+            start_time = time.time()
+            response = self.send_raw(printer, [b'~HS'], delay=0)
+            assert 'STATUS:' in response
+            assert time.time() - start_time >= 0.5
+        finally:
+            http.delete(faults_url, timeout=10)
+
+    def test_fault_profile_validation(self, http, printer):
+        """Nieznane ustawienia profilu błędów są odrzucane"""
+        response = http.put(
+            f"http://{printer['host']}:{printer['web_port']}/api/faults",
+            json={'unknown_setting': 1},
+            timeout=10
+        )
+        assert response.status_code == 400
+
+    def test_stored_format_recall(self, http, printer):
+        """Format zapisany przez ^DF drukowany jest przez ^XF z danymi pól ^FN"""
+        formats_url = f"http://{printer['host']}:{printer['web_port']}/api/formats"
+        hits_before = http.get(formats_url, timeout=10).json()['hits']
+
+        response = self.send_raw(printer, [
+            b'^XA^DFR:TEST.ZPL^FS^FO50,50^A0N,30,30^FN1^FDdefault^FS^XZ'
+        ])
+        assert 'FORMAT STORED: R:TEST.ZPL' in response
+
+        jobs_before = self.get_jobs_printed(http, printer)
+        response = self.send_raw(printer, [b'^XA^XFR:TEST.ZPL^FS^FN1^FDProduct^FS^XZ'])
+        assert 'JOB COMPLETED' in response
+        assert self.get_jobs_printed(http, printer) - jobs_before == 1
+        assert http.get(formats_url, timeout=10).json()['hits'] - hits_before == 1
+
+        response = self.send_raw(printer, [b'^XA^XFR:MISSING.ZPL^FS^XZ'])
+        assert 'ERROR: FORMAT NOT FOUND' in response
+
+    def test_z64_graphic_download(self, http, printer):
+        """Grafika ~DG w kodowaniu Z64 jest dekodowana, a błędne CRC odrzucane"""
+        graphics_url = f"http://{printer['host']}:{printer['web_port']}/api/graphics"
+        bitmap = bytes(range(256)) * 4
+        encoded = base64.b64encode(zlib.compress(bitmap))
+        crc = b'%04X' % binascii.crc_hqx(encoded, 0)
+        header = b'~DGR:TESTLOGO.GRF,%d,16,:Z64:' % len(bitmap)
+
+        errors_before = http.get(graphics_url, timeout=10).json()['errors'].get('crc_mismatch', 0)
+        self.send_raw(printer, [header + encoded + b':' + crc + b'\n'])
+
+        graphics = {g['name']: g for g in http.get(graphics_url, timeout=10).json()['graphics']}
+        assert graphics['R:TESTLOGO.GRF']['height'] == len(bitmap) // 16
+        assert graphics['R:TESTLOGO.GRF']['encoding'] == 'z64'
+
+        self.send_raw(printer, [header.replace(b'TESTLOGO', b'BADLOGO') + encoded + b':0000\n'])
+        errors = http.get(graphics_url, timeout=10).json()['errors']
+        assert errors.get('crc_mismatch', 0) - errors_before == 1
+
+    def test_label_preview(self, http, printer):
+        """Podgląd etykiety zwracany jest jako PNG w wymiarach z ^PW/^LL"""
+        base_url = f"http://{printer['host']}:{printer['web_port']}/api/jobs"
+        self.send_raw(printer, [b'^XA^PW400^LL200^FO20,20^A0N,40,30^FDPREVIEW^FS^FO20,80^BY2^BCN,60,N^FD12345678^FS^XZ'])
+
+        job = http.get(base_url, params={'limit': 1}, timeout=10).json()['jobs'][0]
+        assert job['kind'] == 'format'
+
+        response = http.get(f"{base_url}/{job['id']}/preview.png", timeout=10)
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'image/png'
+        assert response.content[:8] == b'\x89PNG\r\n\x1a\n'
+        width, height = struct.unpack('>II', response.content[16:24])
+        assert (width, height) == (400, 200)
+
+    def test_label_preview_font_without_orientation(self, http, printer):
+        """^A0,h,w bez orientacji rysuje tekst w tym samym rozmiarze co ^A0N,h,w"""
+        base_url = f"http://{printer['host']}:{printer['web_port']}/api/jobs"
+        previews = []
+        for font in (b'^A0N,60,30', b'^A0,60,30', b'^A0N,30,60'):
+            self.send_raw(printer, [b'^XA^PW300^LL100^FO10,10' + font + b'^FDFONT^FS^XZ'])
+            job = http.get(base_url, params={'limit': 1}, timeout=10).json()['jobs'][0]
+            response = http.get(f"{base_url}/{job['id']}/preview.png", timeout=10)
+            assert response.status_code == 200
+            previews.append(response.content)
+
+        assert previews[0] == previews[1]
+        assert previews[0] != previews[2]
+
+    def test_print_quantity_and_serialization(self, http, printer):
+        """^PQ liczy etykiety zamiast formatów, a ^SN wylicza ostatni numer serii"""
+        status_url = f"http://{printer['host']}:{printer['web_port']}/api/status"
+        labels_before = http.get(status_url, timeout=10).json()['labels_printed']
+        jobs_before = self.get_jobs_printed(http, printer)
+
+        self.send_raw(printer, [b'^XA^FO50,50^SN0001,1,Y^FS^PQ10000,0,2^XZ'])
+
+        status = http.get(status_url, timeout=10).json()
+        assert status['jobs_printed'] - jobs_before == 1
+        assert status['labels_printed'] - labels_before == 10000
+        assert status['last_serial'] == '5000'
+
+    def test_http_batch_submission(self, http, printer):
+        """POST /pstprnt przetwarza wiele formatów z jednego żądania i zwraca wynik każdego"""
+        jobs_before = self.get_jobs_printed(http, printer)
+        body = b''.join(b'^XA^FO50,50^A0N,30,30^FDBatch %d^FS^XZ' % i for i in range(100)) + b'~HS'
+
+        response = http.post(
+            f"http://{printer['host']}:{printer['web_port']}/pstprnt",
+            data=body,
+            timeout=30
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert result['format_count'] == 100
+        assert result['failed'] == 0
+        assert all(item['response'].startswith('JOB COMPLETED') for item in result['formats'])
+        assert 'STATUS:' in result['host_responses']
+        assert self.get_jobs_printed(http, printer) - jobs_before == 100
+
+    def test_status_conditional_get(self, http, printer):
+        """/api/status z If-None-Match zwraca 304, dopóki stan drukarki się nie zmieni"""
+        status_url = f"http://{printer['host']}:{printer['web_port']}/api/status"
+        etag = http.get(status_url, timeout=10).headers['ETag']
+
+        response = http.get(status_url, headers={'If-None-Match': etag}, timeout=10)
+        assert response.status_code == 304
+        assert response.content == b''
+
+        # Same zapytania o status nie zmieniają stanu
+        self.send_raw(printer, [b'~HS', b'~HI'])
+        response = http.get(status_url, headers={'If-None-Match': etag}, timeout=10)
+        assert response.status_code == 304
+
+        self.send_raw(printer, [b'^XA^FO50,50^FDEtag^FS^XZ'])
+        response = http.get(status_url, headers={'If-None-Match': etag}, timeout=10)
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_web_interface_gzip(self, http, printer):
+        """Strona mocka jest kompresowana gzip-em dla klientów, które to akceptują"""
+        response = http.get(
+            f"http://{printer['host']}:{printer['web_port']}/",
+            headers={'Accept-Encoding': 'gzip'},
+            timeout=10
+        )
+        assert response.status_code == 200
+        assert response.headers.get('Content-Encoding') == 'gzip'
+        assert 'ZEBRA Printer Mock' in response.text
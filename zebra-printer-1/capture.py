@@ -0,0 +1,97 @@
+# zebra-printer-1/capture.py
+# Zapis ruchu przychodzącego na port 9100 do binarnego pliku (append-only)
+import struct
+import threading
+import time
+
+CAPTURE_MAGIC = b'ZPLCAP1\n'
+
+# znacznik czasu (s od epoki), id połączenia, typ rekordu, długość danych
+RECORD_HEADER = struct.Struct('<dIBI')
+
+RECORD_OPEN = 0
+RECORD_DATA = 1
+RECORD_CLOSE = 2
+# Początek nagrania jednego uruchomienia mocka - id połączeń liczone są od nowa
+RECORD_SESSION = 3
+
+FLUSH_INTERVAL = 1.0
+
+
+class CaptureWriter:
+    """Dopisuje rekordy otwarcia, danych i zamknięcia połączeń do pliku przechwytywania
+
+    Plik jest otwierany w trybie dopisywania, więc kolejne uruchomienia mocka
+    wydłużają to samo nagranie; każde zaczyna się rekordem RECORD_SESSION,
+    bo id połączeń w nowym procesie znów zaczynają się od 1. Zapis jest buforowany, a wątek w tle opróżnia
+    bufor co FLUSH_INTERVAL sekund, także gdy nie przychodzą nowe rekordy;
+    close() przy zatrzymaniu mocka zapisuje resztę.
+    """
+
+    def __init__(self, path, buffer_size=1024 * 1024):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab', buffering=buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_MAGIC)
+        self._dirty = False
+        self._closed = threading.Event()
+        self.records_written = 0
+        self._write(0, RECORD_SESSION, b'')
+        thread = threading.Thread(target=self._flush_periodically, name='capture-flush', daemon=True)
+        thread.start()
+
+    def open_connection(self, connection_id):
+        self._write(connection_id, RECORD_OPEN, b'')
+
+    def data(self, connection_id, data):
+        self._write(connection_id, RECORD_DATA, data)
+
+    def close_connection(self, connection_id):
+        self._write(connection_id, RECORD_CLOSE, b'')
+
+    def _write(self, connection_id, record_type, data):
+        header = RECORD_HEADER.pack(time.time(), connection_id & 0xFFFFFFFF, record_type, len(data))
+        with self._lock:
+            # Połączenia obsługiwane jeszcze w trakcie zatrzymywania - plik już zamknięty
+            if self._file.closed:
+                return
+            self._file.write(header)
+            if data:
+                self._file.write(data)
+            self.records_written += 1
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if self._dirty and not self._file.closed:
+                self._file.flush()
+                self._dirty = False
+
+    def _flush_periodically(self):
+        while not self._closed.wait(FLUSH_INTERVAL):
+            self.flush()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(path):
+    """Generator rekordów (znacznik czasu, id połączenia, typ, dane) w kolejności zapisu"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(CAPTURE_MAGIC))
+        if magic != CAPTURE_MAGIC:
+            raise ValueError(f"Not a ZPL capture file: {path}")
+
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                # Niepełny rekord na końcu pliku (np. przerwany zapis) jest pomijany
+                return
+            timestamp, connection_id, record_type, length = RECORD_HEADER.unpack(header)
+            data = f.read(length) if length else b''
+            if len(data) < length:
+                return
+            yield timestamp, connection_id, record_type, data
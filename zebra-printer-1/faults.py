@@ -0,0 +1,202 @@
+# zebra-printer-1/faults.py
+# Profile wstrzykiwania błędów i opóźnień dla mocka drukarki
+import copy
+import json
+import logging
+import math
+import os
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ('none', 'fixed', 'uniform', 'normal', 'exponential')
+FLAP_STATUSES = ('PAUSED', 'ERROR')
+# Rozmiary w bajtach - SO_RCVBUF i długość odczytu muszą być dodatnimi liczbami całkowitymi
+POSITIVE_INT_SETTINGS = ('slow_reader.receive_buffer', 'slow_reader.read_size')
+
+DEFAULT_PROFILE = {
+    # Opóźnienie odpowiedzi w sekundach
+    'latency': {
+        'distribution': 'none',
+        'mean': 0.0,
+        'stddev': 0.0,
+        'min': 0.0,
+        'max': 0.0
+    },
+    # Połączenie przyjęte, ale drukarka nigdy nie odpowiada
+    'blackhole_probability': 0.0,
+    # Reset (RST) połączenia w trakcie odbierania formatu
+    'reset_probability': 0.0,
+    # Wolny odbiorca - mały SO_RCVBUF i przerwy między odczytami
+    'slow_reader': {
+        'enabled': False,
+        'receive_buffer': 1024,
+        'read_size': 256,
+        'read_pause': 0.1
+    },
+    # Okresowy status PAUSED/ERROR
+    'status_flap': {
+        'enabled': False,
+        'status': 'PAUSED',
+        'period': 60.0,
+        'duration': 10.0
+    }
+}
+
+
+def merge_profile(base, changes):
+    """Nakłada częściowy profil na istniejący; nieznane klucze zgłaszane są jako ValueError"""
+    if not isinstance(changes, dict):
+        raise ValueError("Fault profile must be an object")
+    merged = copy.deepcopy(base)
+    for key, value in changes.items():
+        if key not in merged:
+            raise ValueError(f"Unknown fault setting: {key}")
+        if isinstance(merged[key], dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"Fault setting {key} must be an object")
+            for sub_key, sub_value in value.items():
+                if sub_key not in merged[key]:
+                    raise ValueError(f"Unknown fault setting: {key}.{sub_key}")
+                merged[key][sub_key] = sub_value
+        else:
+            merged[key] = value
+    validate_profile(merged)
+    return merged
+
+
+def _check_types(defaults, values, prefix=''):
+    # Typ każdego ustawienia jak w DEFAULT_PROFILE; liczby skończone i nieujemne
+    for key, default in defaults.items():
+        name, value = prefix + key, values[key]
+        if isinstance(default, dict):
+            _check_types(default, value, f"{name}.")
+        elif isinstance(default, bool):
+            if not isinstance(value, bool):
+                raise ValueError(f"{name} must be true or false")
+        elif isinstance(default, str):
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+            raise ValueError(f"{name} must be a non-negative number")
+        elif name in POSITIVE_INT_SETTINGS and (value < 1 or value != int(value)):
+            raise ValueError(f"{name} must be a positive integer")
+
+
+def validate_profile(profile):
+    _check_types(DEFAULT_PROFILE, profile)
+    if profile['latency']['distribution'] not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution: {profile['latency']['distribution']}")
+    if profile['status_flap']['status'] not in FLAP_STATUSES:
+        raise ValueError(f"Status flap must be one of {FLAP_STATUSES}")
+    for key in ('blackhole_probability', 'reset_probability'):
+        if not 0.0 <= float(profile[key]) <= 1.0:
+            raise ValueError(f"{key} must be between 0 and 1")
+    flap = profile['status_flap']
+    if flap['enabled'] and not 0 < float(flap['duration']) < float(flap['period']):
+        raise ValueError("status_flap.duration must be positive and shorter than period")
+
+
+def load_profile_setting(value):
+    """Profil z PRINTER_FAULT_PROFILE - JSON w zmiennej albo ścieżka do pliku JSON"""
+    if not value:
+        return {}
+    if os.path.exists(value):
+        with open(value, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+class FaultInjector:
+    """Losuje decyzje o błędach dla pojedynczej drukarki na podstawie aktywnego profilu
+
+    Profil można podmieniać w trakcie działania (/api/faults); nowe
+    połączenia i kolejne odpowiedzi od razu korzystają z nowych ustawień.
+    on_profile_change dostaje nowy profil przed jego przyjęciem - wyjątek
+    z callbacku pozostawia poprzedni profil.
+    """
+
+    def __init__(self, profile=None, on_status_change=None, on_profile_change=None, seed=None):
+        self._random = random.Random(seed)
+        self._on_status_change = on_status_change
+        self._on_profile_change = on_profile_change
+        self._flap_stop = None
+        self.profile = copy.deepcopy(DEFAULT_PROFILE)
+        if profile:
+            self.update(profile)
+
+    @property
+    def active(self):
+        return self.profile != DEFAULT_PROFILE
+
+    def update(self, changes):
+        return self._apply(merge_profile(self.profile, changes))
+
+    def reset(self):
+        return self._apply(copy.deepcopy(DEFAULT_PROFILE))
+
+    def _apply(self, profile):
+        if self._on_profile_change:
+            self._on_profile_change(profile)
+        self.profile = profile
+        self._restart_status_flap()
+        return self.profile
+
+    def response_delay(self):
+        latency = self.profile['latency']
+        distribution = latency['distribution']
+        if distribution == 'none':
+            return 0.0
+        if distribution == 'fixed':
+            return float(latency['mean'])
+        if distribution == 'uniform':
+            return self._random.uniform(float(latency['min']), float(latency['max']))
+        if distribution == 'normal':
+            return max(0.0, self._random.gauss(float(latency['mean']), float(latency['stddev'])))
+        return self._random.expovariate(1.0 / float(latency['mean'])) if latency['mean'] else 0.0
+
+    def should_blackhole(self):
+        return self._chance(self.profile['blackhole_probability'])
+
+    def should_reset(self):
+        return self._chance(self.profile['reset_probability'])
+
+    def slow_reader(self):
+        """Ustawienia wolnego odbiorcy lub None, gdy wyłączone"""
+        slow_reader = self.profile['slow_reader']
+        return slow_reader if slow_reader['enabled'] else None
+
+    def _chance(self, probability):
+        return probability > 0 and self._random.random() < probability
+
+    def _restart_status_flap(self):
+        if self._flap_stop:
+            self._flap_stop.set()
+            self._flap_stop = None
+            self._notify_status(None)
+
+        flap = self.profile['status_flap']
+        if flap['enabled'] and self._on_status_change:
+            self._flap_stop = threading.Event()
+            thread = threading.Thread(
+                target=self._run_status_flap,
+                args=(self._flap_stop, flap['status'], float(flap['period']), float(flap['duration'])),
+                name='fault-status-flap',
+                daemon=True
+            )
+            thread.start()
+
+    def _run_status_flap(self, stop, status, period, duration):
+        while not stop.wait(period - duration):
+            self._notify_status(status)
+            if stop.wait(duration):
+                break
+            self._notify_status(None)
+
+    def _notify_status(self, status):
+        if self._on_status_change:
+            try:
+                self._on_status_change(status)
+            except Exception as e:
+                logger.error(f"Fault status callback error: {e}")
@@ -0,0 +1,197 @@
+# zebra-printer-1/fleet.py
+# Tryb floty - wiele wirtualnych drukarek w jednym procesie
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from metrics import OPENMETRICS_CONTENT_TYPE, OpenMetricsWriter
+from zebra_mock import DEFAULT_WEB_THREADS, ZebraPrinterMock, exit_on_sigterm, raise_nofile_limit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAME_PATTERN = 'ZEBRA-{index:03d}'
+DEFAULT_MODEL = 'ZT230'
+
+
+def load_fleet_config(path):
+    """Ładuje konfigurację floty z pliku JSON
+
+    Obsługiwane są dwa warianty: słownik z listą "printers" (oraz opcjonalnie
+    "count", "base_port", "name_pattern") albo pojedynczy wpis drukarki z
+    polami "name" i "model", jak w config/printer_config.json.
+    """
+    config_file = Path(path)
+    if not config_file.exists() or config_file.stat().st_size == 0:
+        return {'printers': []}
+
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    if isinstance(config, list):
+        return {'printers': config}
+    if 'printers' not in config:
+        return {'printers': [config]}
+    return config
+
+
+def build_printer_specs(config, count=None):
+    """Lista (nazwa, model) dla count drukarek - brakujące wpisy generowane są z name_pattern"""
+    printers = config.get('printers', [])
+    count = count or config.get('count') or len(printers) or 1
+    name_pattern = config.get('name_pattern', DEFAULT_NAME_PATTERN)
+    default_model = config.get('model', DEFAULT_MODEL)
+
+    specs = []
+    for index in range(count):
+        entry = printers[index] if index < len(printers) else {}
+        specs.append((
+            entry.get('name') or name_pattern.format(index=index + 1),
+            entry.get('model') or default_model
+        ))
+    return specs
+
+
+class ZebraPrinterFleet:
+    """N instancji ZebraPrinterMock na kolejnych portach, wspólna pętla asyncio i jeden serwer HTTP
+
+    Interfejs web każdej drukarki dostępny jest pod /printers/<nazwa>/,
+    a /api/metrics zwraca metryki całej floty w jednej odpowiedzi. W trybie
+    headless flota obsługuje tylko porty ZPL, bez importu Flaska.
+    """
+
+    def __init__(self, specs, host='0.0.0.0', base_port=9100, web_port=8080, headless=False,
+                 web_threads=DEFAULT_WEB_THREADS, **printer_options):
+        self.host = host
+        self.base_port = base_port
+        self.web_port = web_port
+        self.headless = headless
+        self.web_threads = web_threads
+        # Wszystkie drukarki dzielą jedną pulę wątków - strumienie SSE razem zajmują najwyżej jej połowę
+        printer_options.setdefault('max_status_streams', max(web_threads // (2 * max(len(specs), 1)), 1))
+        self.printers = [
+            ZebraPrinterMock(
+                name,
+                model,
+                host=host,
+                port=base_port + index,
+                server_mode='asyncio',
+                headless=headless,
+                **printer_options
+            )
+            for index, (name, model) in enumerate(specs)
+        ]
+        self.web_app = None if headless else self.create_web_app()
+
+    def create_web_app(self):
+        from flask import Flask, Response, jsonify
+        from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+        app = Flask(__name__)
+
+        @app.route('/')
+        @app.route('/api/fleet')
+        def api_fleet():
+            return jsonify([
+                {
+                    'name': printer.name,
+                    'model': printer.model,
+                    'port': printer.port,
+                    'status': printer.current_status,
+                    'jobs_printed': printer.jobs_printed,
+                    'url': f"/printers/{printer.name}/"
+                }
+                for printer in self.printers
+            ])
+
+        @app.route('/api/metrics')
+        def api_metrics():
+            writer = OpenMetricsWriter()
+            for printer in self.printers:
+                printer.write_metrics(writer)
+            return Response(writer.render(), content_type=OPENMETRICS_CONTENT_TYPE)
+
+        mounts = {f"/printers/{printer.name}": printer.web_app for printer in self.printers}
+        app.wsgi_app = DispatcherMiddleware(app.wsgi_app, mounts)
+        return app
+
+    async def serve_async(self):
+        servers = [await printer.create_async_server() for printer in self.printers]
+        logger.info(
+            f"Fleet of {len(servers)} printers listening on ports "
+            f"{self.base_port}-{self.base_port + len(servers) - 1}"
+        )
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+
+    def start_socket_servers(self):
+        raise_nofile_limit()
+        try:
+            asyncio.run(self.serve_async())
+        except Exception as e:
+            logger.error(f"Fleet socket server error: {e}")
+
+    def start(self):
+        if self.headless:
+            self.start_socket_servers()
+            return
+
+        from waitress import serve
+        socket_thread = threading.Thread(target=self.start_socket_servers)
+        socket_thread.daemon = True
+        socket_thread.start()
+
+        logger.info(f"Serving fleet web interface with waitress on port {self.web_port} ({self.web_threads} threads)")
+        serve(self.web_app, host='0.0.0.0', port=self.web_port, threads=self.web_threads, ident=None)
+
+    def shutdown(self):
+        for printer in self.printers:
+            printer.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='ZEBRA printer mock fleet')
+    parser.add_argument('--config', default=os.getenv('FLEET_CONFIG', 'config/fleet_config.json'))
+    parser.add_argument('--count', type=int, default=int(os.getenv('FLEET_COUNT', '0')) or None)
+    parser.add_argument('--base-port', type=int, default=None)
+    parser.add_argument('--web-port', type=int, default=int(os.getenv('FLASK_RUN_PORT', '8080')))
+    parser.add_argument(
+        '--web-threads',
+        type=int,
+        default=int(os.getenv('PRINTER_WEB_THREADS', str(DEFAULT_WEB_THREADS)))
+    )
+    parser.add_argument('--print-engine', default=os.getenv('PRINTER_PRINT_ENGINE', 'instant'))
+    parser.add_argument('--connection-mode', default=os.getenv('PRINTER_CONNECTION_MODE', 'keepalive'))
+    parser.add_argument('--idle-timeout', type=float, default=float(os.getenv('PRINTER_IDLE_TIMEOUT', '0')))
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        default=os.getenv('PRINTER_HEADLESS', '').lower() in ('1', 'true', 'yes'),
+        help='Serve only the ZPL ports, without the web interface'
+    )
+    return parser.parse_args()
+
+
+# Main execution
+if __name__ == '__main__':
+    args = parse_args()
+    fleet_config = load_fleet_config(args.config)
+    base_port = args.base_port or int(fleet_config.get('base_port', os.getenv('FLEET_BASE_PORT', '9100')))
+
+    fleet = ZebraPrinterFleet(
+        build_printer_specs(fleet_config, args.count),
+        base_port=base_port,
+        web_port=args.web_port,
+        web_threads=args.web_threads,
+        print_engine=args.print_engine,
+        connection_mode=args.connection_mode,
+        idle_timeout=args.idle_timeout,
+        headless=args.headless
+    )
+    exit_on_sigterm()
+    try:
+        fleet.start()
+    finally:
+        fleet.shutdown()
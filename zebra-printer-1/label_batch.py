@@ -0,0 +1,80 @@
+# zebra-printer-1/label_batch.py
+# Ilość etykiet (^PQ) i numeracja seryjna (^SN) jednego formatu rozliczane arytmetycznie
+import re
+
+# Maksymalna ilość ^PQ według dokumentacji ZPL
+MAX_QUANTITY = 99999999
+
+# Numerowana jest ostatnia grupa cyfr wartości ^SN (np. "LOT-0099" -> "0099")
+SERIAL_DIGITS = re.compile(rb'(\d+)(\D*)$')
+
+
+def _int_param(fields, index, default, minimum=0, maximum=MAX_QUANTITY):
+    try:
+        value = int(fields[index].strip())
+    except (IndexError, ValueError):
+        return default
+    return min(max(value, minimum), maximum)
+
+
+def advance_serial(value, increment, steps, zeros=False):
+    """Wartość ^SN po steps krokach o increment - bez iterowania po kolejnych etykietach"""
+    match = SERIAL_DIGITS.search(value)
+    if match is None:
+        return value
+    digits, suffix = match.groups()
+    number = max(int(digits) + increment * steps, 0)
+    text = str(number).encode('ascii')
+    if zeros:
+        text = text.zfill(len(digits))
+    return value[:match.start()] + text + suffix
+
+
+class LabelBatch:
+    """Parametry ^PQq,p,r,o i pola ^SNv,n,z jednego formatu
+
+    Format z ^PQ500 to jedno zadanie, ale 500 etykiet: liczniki, liczba
+    pauz i końcowe numery seryjne wyliczane są wzorami, więc koszt
+    rozliczenia nie zależy od ilości.
+    """
+
+    __slots__ = ('quantity', 'pause_every', 'replicates', 'override_pause', 'serials')
+
+    def __init__(self):
+        self.quantity = 1
+        self.pause_every = 0
+        self.replicates = 1
+        self.override_pause = False
+        self.serials = []
+
+    def set_quantity(self, params):
+        # ^PQq,p,r,o - ilość, pauza i cięcie co p etykiet, r kopii każdego numeru, o=Y bez pauz
+        fields = params.split(b',')
+        self.quantity = _int_param(fields, 0, 1, minimum=1)
+        self.pause_every = _int_param(fields, 1, 0)
+        self.replicates = _int_param(fields, 2, 0) or 1
+        self.override_pause = len(fields) > 3 and fields[3].strip().upper() == b'Y'
+
+    def add_serial(self, params):
+        # ^SNv,n,z - wartość początkowa, krok (może być ujemny), Y = zera wiodące
+        fields = params.split(b',')
+        value = fields[0].strip()
+        increment = _int_param(fields, 1, 1, minimum=-MAX_QUANTITY)
+        zeros = len(fields) > 2 and fields[2].strip().upper() == b'Y'
+        self.serials.append((value, increment, zeros))
+
+    @property
+    def pauses(self):
+        """Pauzy z cięciem po każdej grupie p etykiet (bez ostatniej grupy)"""
+        if not self.pause_every or self.override_pause:
+            return 0
+        return (self.quantity - 1) // self.pause_every
+
+    @property
+    def serial_steps(self):
+        """Liczba zmian numeru seryjnego - każdy numer drukowany jest replicates razy"""
+        return (self.quantity - 1) // self.replicates
+
+    def last_serials(self):
+        steps = self.serial_steps
+        return [advance_serial(value, increment, steps, zeros) for value, increment, zeros in self.serials]
@@ -0,0 +1,190 @@
+# zebra-printer-1/metrics.py
+# Liczniki metryk bez blokad na ścieżce krytycznej, agregowane dopiero przy odczycie (scrape)
+import abc
+import bisect
+import threading
+import weakref
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Domyślne progi histogramu czasu przetwarzania komend (sekundy)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class _ShardHandle:
+    """Obiekt trzymany w threading.local - jego zwolnienie przy końcu wątku scala shard"""
+
+    __slots__ = ('data', '__weakref__')
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _Sharded(abc.ABC):
+    """Wspólna logika shardów per wątek
+
+    Każdy wątek zapisuje wyłącznie do własnego sharda, więc inkrementacja
+    nie wymaga blokady. Blokada używana jest tylko przy tworzeniu sharda,
+    przy scaleniu sharda zakończonego wątku i przy odczycie.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live = {}
+        self._retired = self._new_data()
+
+    @abc.abstractmethod
+    def _new_data(self):
+        """Pusty shard"""
+
+    @abc.abstractmethod
+    def _merge(self, target, data):
+        """Dodaje zawartość sharda data do target"""
+
+    def _shard(self):
+        try:
+            return self._local.handle.data
+        except AttributeError:
+            data = self._new_data()
+            handle = _ShardHandle(data)
+            with self._lock:
+                self._live[id(data)] = data
+            weakref.finalize(handle, self._retire, id(data))
+            self._local.handle = handle
+            return data
+
+    def _retire(self, key):
+        with self._lock:
+            data = self._live.pop(key, None)
+            if data is not None:
+                self._merge(self._retired, data)
+
+    def _collect(self):
+        with self._lock:
+            total = self._new_data()
+            self._merge(total, self._retired)
+            for data in list(self._live.values()):
+                self._merge(total, data)
+        return total
+
+    def reset(self):
+        with self._lock:
+            self._retired = self._new_data()
+            for data in self._live.values():
+                self._clear(data)
+
+    @abc.abstractmethod
+    def _clear(self, data):
+        """Zeruje shard w miejscu - wątek dalej trzyma do niego referencję"""
+
+
+class ShardedCounter(_Sharded):
+    """Licznik z etykietą (np. mnemonik komendy); klucz None oznacza licznik bez etykiet"""
+
+    def _new_data(self):
+        return {}
+
+    def _merge(self, target, data):
+        for key, value in data.copy().items():
+            target[key] = target.get(key, 0) + value
+
+    def _clear(self, data):
+        data.clear()
+
+    def shard(self):
+        """Słownik bieżącego wątku - do wielu inkrementacji w jednej pętli"""
+        return self._shard()
+
+    def inc(self, key=None, amount=1):
+        shard = self._shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def snapshot(self):
+        return self._collect()
+
+    def value(self, key=None):
+        return self._collect().get(key, 0)
+
+
+class ShardedHistogram(_Sharded):
+    """Histogram o stałych progach; shard to lista liczników kubełków i suma na końcu"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__()
+
+    def _new_data(self):
+        return [0] * (len(self.buckets) + 2)
+
+    def _merge(self, target, data):
+        for index, value in enumerate(list(data)):
+            target[index] += value
+
+    def _clear(self, data):
+        for index in range(len(data)):
+            data[index] = 0
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """Zwraca (skumulowane liczniki kubełków łącznie z +Inf, suma, liczba obserwacji)"""
+        data = self._collect()
+        cumulative = []
+        running = 0
+        for count in data[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, data[-1], running
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class OpenMetricsWriter:
+    """Buduje odpowiedź w formacie OpenMetrics
+
+    Próbki są grupowane w rodzinach, więc kilka drukarek (tryb floty) może
+    zapisywać do jednego writera bez powtarzania nagłówków TYPE/HELP.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._current = None
+
+    def family(self, name, metric_type, help_text):
+        if name not in self._families:
+            self._families[name] = [f'# TYPE {name} {metric_type}', f'# HELP {name} {help_text}']
+        self._current = self._families[name]
+
+    def sample(self, name, value, labels=None):
+        self._current.append(f'{name}{_format_labels(labels)} {value}')
+
+    def histogram(self, name, histogram, labels=None):
+        cumulative, total, count = histogram.snapshot()
+        labels = dict(labels or {})
+        for bound, bucket_count in zip(histogram.buckets + (float('inf'),), cumulative):
+            bucket_labels = dict(labels, le='+Inf' if bound == float('inf') else repr(bound))
+            self.sample(f'{name}_bucket', bucket_count, bucket_labels)
+        self.sample(f'{name}_sum', total, labels)
+        self.sample(f'{name}_count', count, labels)
+
+    def render(self):
+        lines = []
+        for family_lines in self._families.values():
+            lines.extend(family_lines)
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
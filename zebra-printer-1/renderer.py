@@ -0,0 +1,375 @@
+# zebra-printer-1/renderer.py
+# Rasteryzacja etykiet ZPL do bitmapy 1-bit (podgląd zadań) i pamięć podręczna podglądów
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from graphics import REFERENCE_PREFIX, graphic_name
+from zpl_commands import tokenize
+
+DEFAULT_PREVIEW_CACHE_BYTES = 8 * 1024 * 1024
+MAX_LABEL_DOTS = 8000
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Orientacje ^A - pole opcjonalne (^A0,h,w to poprawny ZPL)
+FONT_ORIENTATIONS = (b'N', b'R', b'I', b'B')
+
+# Font 5x7 - wiersze od góry, bit 4 = lewa kolumna; małe litery rysowane jak wielkie
+FONT_5X7 = {
+    '0': (0x0E, 0x11, 0x13, 0x15, 0x19, 0x11, 0x0E), '1': (0x04, 0x0C, 0x04, 0x04, 0x04, 0x04, 0x0E),
+    '2': (0x0E, 0x11, 0x01, 0x02, 0x04, 0x08, 0x1F), '3': (0x1F, 0x02, 0x04, 0x02, 0x01, 0x11, 0x0E),
+    '4': (0x02, 0x06, 0x0A, 0x12, 0x1F, 0x02, 0x02), '5': (0x1F, 0x10, 0x1E, 0x01, 0x01, 0x11, 0x0E),
+    '6': (0x06, 0x08, 0x10, 0x1E, 0x11, 0x11, 0x0E), '7': (0x1F, 0x01, 0x02, 0x04, 0x08, 0x08, 0x08),
+    '8': (0x0E, 0x11, 0x11, 0x0E, 0x11, 0x11, 0x0E), '9': (0x0E, 0x11, 0x11, 0x0F, 0x01, 0x02, 0x0C),
+    'A': (0x0E, 0x11, 0x11, 0x1F, 0x11, 0x11, 0x11), 'B': (0x1E, 0x11, 0x11, 0x1E, 0x11, 0x11, 0x1E),
+    'C': (0x0E, 0x11, 0x10, 0x10, 0x10, 0x11, 0x0E), 'D': (0x1C, 0x12, 0x11, 0x11, 0x11, 0x12, 0x1C),
+    'E': (0x1F, 0x10, 0x10, 0x1E, 0x10, 0x10, 0x1F), 'F': (0x1F, 0x10, 0x10, 0x1E, 0x10, 0x10, 0x10),
+    'G': (0x0E, 0x11, 0x10, 0x17, 0x11, 0x11, 0x0F), 'H': (0x11, 0x11, 0x11, 0x1F, 0x11, 0x11, 0x11),
+    'I': (0x0E, 0x04, 0x04, 0x04, 0x04, 0x04, 0x0E), 'J': (0x07, 0x02, 0x02, 0x02, 0x02, 0x12, 0x0C),
+    'K': (0x11, 0x12, 0x14, 0x18, 0x14, 0x12, 0x11), 'L': (0x10, 0x10, 0x10, 0x10, 0x10, 0x10, 0x1F),
+    'M': (0x11, 0x1B, 0x15, 0x15, 0x11, 0x11, 0x11), 'N': (0x11, 0x11, 0x19, 0x15, 0x13, 0x11, 0x11),
+    'O': (0x0E, 0x11, 0x11, 0x11, 0x11, 0x11, 0x0E), 'P': (0x1E, 0x11, 0x11, 0x1E, 0x10, 0x10, 0x10),
+    'Q': (0x0E, 0x11, 0x11, 0x11, 0x15, 0x12, 0x0D), 'R': (0x1E, 0x11, 0x11, 0x1E, 0x14, 0x12, 0x11),
+    'S': (0x0F, 0x10, 0x10, 0x0E, 0x01, 0x01, 0x1E), 'T': (0x1F, 0x04, 0x04, 0x04, 0x04, 0x04, 0x04),
+    'U': (0x11, 0x11, 0x11, 0x11, 0x11, 0x11, 0x0E), 'V': (0x11, 0x11, 0x11, 0x11, 0x11, 0x0A, 0x04),
+    'W': (0x11, 0x11, 0x11, 0x15, 0x15, 0x15, 0x0A), 'X': (0x11, 0x11, 0x0A, 0x04, 0x0A, 0x11, 0x11),
+    'Y': (0x11, 0x11, 0x11, 0x0A, 0x04, 0x04, 0x04), 'Z': (0x1F, 0x01, 0x02, 0x04, 0x08, 0x10, 0x1F),
+    ' ': (0, 0, 0, 0, 0, 0, 0), '-': (0, 0, 0, 0x1F, 0, 0, 0),
+    '.': (0, 0, 0, 0, 0, 0x0C, 0x0C), ',': (0, 0, 0, 0, 0x0C, 0x04, 0x08),
+    ':': (0, 0x0C, 0x0C, 0, 0x0C, 0x0C, 0), '/': (0, 0x01, 0x02, 0x04, 0x08, 0x10, 0),
+    '#': (0x0A, 0x0A, 0x1F, 0x0A, 0x1F, 0x0A, 0x0A), '(': (0x02, 0x04, 0x08, 0x08, 0x08, 0x04, 0x02),
+    ')': (0x08, 0x04, 0x02, 0x02, 0x02, 0x04, 0x08), '+': (0, 0x04, 0x04, 0x1F, 0x04, 0x04, 0),
+    '%': (0x18, 0x19, 0x02, 0x04, 0x08, 0x13, 0x03), '_': (0, 0, 0, 0, 0, 0, 0x1F),
+    '?': (0x0E, 0x11, 0x01, 0x02, 0x04, 0, 0x04), '!': (0x04, 0x04, 0x04, 0x04, 0x04, 0, 0x04),
+    '*': (0, 0x04, 0x15, 0x0E, 0x15, 0x04, 0), '=': (0, 0, 0x1F, 0, 0x1F, 0, 0),
+    "'": (0x04, 0x04, 0x08, 0, 0, 0, 0),
+}
+GLYPH_ROWS = 7
+GLYPH_COLUMNS = 6  # 5 kolumn znaku + odstęp
+
+# Szerokości kresek i przerw Code 128 dla wartości 0-106 (106 = STOP)
+CODE128_PATTERNS = (
+    '212222', '222122', '222221', '121223', '121322', '131222', '122213', '122312', '132212', '221213',
+    '221312', '231212', '112232', '122132', '122231', '113222', '123122', '123221', '223211', '221132',
+    '221231', '213212', '223112', '312131', '311222', '321122', '321221', '312212', '322112', '322211',
+    '212123', '212321', '232121', '111323', '131123', '131321', '112313', '132113', '132311', '211313',
+    '231113', '231311', '112133', '112331', '132131', '113123', '113321', '133121', '313121', '211331',
+    '231131', '213113', '213311', '213131', '311123', '311321', '331121', '312113', '312311', '332111',
+    '314111', '221411', '431111', '111224', '111422', '121124', '121421', '141122', '141221', '112214',
+    '112412', '122114', '122411', '142112', '142211', '241211', '221114', '413111', '241112', '134111',
+    '111242', '121142', '121241', '114212', '124112', '124211', '411212', '421112', '421211', '212141',
+    '214121', '412121', '111143', '111341', '131141', '114113', '114311', '411113', '411311', '113141',
+    '114131', '311141', '411131', '211412', '211214', '211232', '2331112',
+)
+CODE128_START_B = 104
+CODE128_START_C = 105
+CODE128_STOP = 106
+
+_glyphs = None
+
+
+def renderer_available():
+    return np is not None
+
+
+def _glyph_table():
+    # Tablica (128, 7, 6) budowana raz; znaki spoza fontu rysowane jako "?"
+    global _glyphs
+    if _glyphs is None:
+        table = np.zeros((128, GLYPH_ROWS, GLYPH_COLUMNS), dtype=bool)
+        bits = np.array([16, 8, 4, 2, 1])
+        for code in range(128):
+            char = chr(code).upper()
+            rows = FONT_5X7.get(char, FONT_5X7['?'])
+            table[code, :, :5] = (np.array(rows)[:, None] & bits) != 0
+        _glyphs = table
+    return _glyphs
+
+
+def code128_values(data):
+    """Wartości symboli Code 128 (start, dane, suma kontrolna, stop) - podzbiór C dla cyfr, B dla reszty"""
+    if data[:2] in ('>;', '>:'):
+        data = data[2:]
+    if len(data) >= 4 and len(data) % 2 == 0 and data.isdigit():
+        values = [CODE128_START_C] + [int(data[i:i + 2]) for i in range(0, len(data), 2)]
+    else:
+        values = [CODE128_START_B] + [min(max(ord(char) - 32, 0), 95) for char in data]
+    checksum = (values[0] + sum(index * value for index, value in enumerate(values[1:], 1))) % 103
+    return values + [checksum, CODE128_STOP]
+
+
+def encode_png(bitmap):
+    """PNG 1-bit w skali szarości; True w bitmapie = punkt czarny"""
+    height, width = bitmap.shape
+    # Bit 1 w PNG oznacza biel, stąd negacja; każdy wiersz poprzedzony filtrem 0
+    rows = np.packbits(~bitmap, axis=1)
+    raw = np.hstack((np.zeros((height, 1), dtype=np.uint8), rows)).tobytes()
+    return b''.join((
+        PNG_SIGNATURE,
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0)),
+        _png_chunk(b'IDAT', zlib.compress(raw, 6)),
+        _png_chunk(b'IEND', b'')
+    ))
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def _numbers(params, defaults):
+    """Parametry komendy rozdzielone przecinkami jako liczby całkowite z wartościami domyślnymi"""
+    values = list(defaults)
+    for index, value in enumerate(params.split(b',')[:len(values)]):
+        try:
+            values[index] = int(float(value))
+        except ValueError:
+            pass
+    return values
+
+
+class _FieldState:
+    __slots__ = ('x', 'y', 'home_x', 'home_y', 'font_height', 'font_width', 'reverse',
+                 'module_width', 'bar_height', 'barcode', 'data')
+
+    def __init__(self):
+        self.x = self.y = 0
+        self.home_x = self.home_y = 0
+        self.font_height, self.font_width = 30, 0
+        self.reverse = False
+        self.module_width, self.bar_height = 2, 10
+        self.barcode = None
+        self.data = None
+
+
+class LabelRenderer:
+    """Rysuje ^FO/^FT, ^A0/^CF, ^FD/^SN, ^GB, ^BY/^BC, ^GF i ^XG na tablicy NumPy (wiersze x kolumny punktów)
+
+    Wszystkie elementy rysowane są operacjami na wycinkach tablicy; obrót
+    pól (orientacja R/I/B) nie jest obsługiwany - pola rysowane są jak N.
+    """
+
+    def __init__(self, dpi, width_dots, length_dots, graphic_store=None):
+        self.dpi = dpi
+        self.width_dots = width_dots
+        self.length_dots = length_dots
+        self.graphic_store = graphic_store
+
+    def render(self, payload):
+        _, commands = tokenize(payload)
+        width, length = self.width_dots, self.length_dots
+        for _, mnemonic, params in commands:
+            if mnemonic == 'PW':
+                width = _numbers(params, (width,))[0]
+            elif mnemonic == 'LL':
+                length = _numbers(params, (length,))[0]
+        canvas = np.zeros((min(max(length, 1), MAX_LABEL_DOTS), min(max(width, 1), MAX_LABEL_DOTS)), dtype=bool)
+
+        field = _FieldState()
+        for _, mnemonic, params in commands:
+            if mnemonic in ('FO', 'FT'):
+                x, y = _numbers(params, (0, 0))
+                field.x, field.y = field.home_x + x, field.home_y + y
+            elif mnemonic == 'LH':
+                field.home_x, field.home_y = _numbers(params, (0, 0))
+            elif mnemonic == 'CF' or (mnemonic[0] == 'A' and mnemonic != 'A@'):
+                # ^A0N,h,w / ^A0,h,w / ^CF0,h,w - pierwsze pole to orientacja (^A) albo czcionka (^CF)
+                if mnemonic != 'CF' and params[:1].upper() in FONT_ORIENTATIONS:
+                    params = params[1:]
+                _, height, font_width = _numbers(params, (0, field.font_height, 0))
+                field.font_height, field.font_width = height, font_width
+            elif mnemonic == 'FR':
+                field.reverse = True
+            elif mnemonic == 'BY':
+                field.module_width, _, field.bar_height = _numbers(params, (field.module_width, 3, field.bar_height))
+            elif mnemonic == 'BC':
+                field.barcode = params
+            elif mnemonic == 'FD':
+                field.data = params
+            elif mnemonic == 'SN':
+                # Podgląd pokazuje pierwszą etykietę serii - wartość początkową
+                field.data = params.split(b',', 1)[0]
+            elif mnemonic == 'GB':
+                self._draw_box(canvas, field, params)
+            elif mnemonic == 'GF':
+                self._draw_graphic(canvas, field, params.split(b',', 4)[-1], 1, 1)
+            elif mnemonic == 'XG':
+                parts = params.split(b',')
+                magnify = _numbers(b','.join(parts[1:]), (1, 1))
+                self._draw_graphic(canvas, field, parts[0], *magnify)
+            elif mnemonic == 'FS':
+                self._finish_field(canvas, field)
+        return canvas
+
+    def _finish_field(self, canvas, field):
+        if field.data is not None:
+            text = field.data.decode('ascii', errors='replace')
+            if field.barcode is not None:
+                self._draw_code128(canvas, field, text)
+            else:
+                self._draw_text(canvas, field.x, field.y, text, field.font_height, field.font_width, field.reverse)
+        field.data = None
+        field.barcode = None
+        field.reverse = False
+
+    def _draw_text(self, canvas, x, y, text, height, width, reverse=False):
+        if not text or height <= 0:
+            return
+        width = width or max(height * 5 // 7, 1)
+        codes = np.frombuffer(text.encode('ascii', errors='replace'), dtype=np.uint8) & 0x7F
+        # (znaki, 7, 6) -> pasek 7 x (6 * znaki), potem skalowanie indeksami wierszy i kolumn
+        strip = _glyph_table()[codes].transpose(1, 0, 2).reshape(GLYPH_ROWS, -1)
+        visible = self._visible(canvas, x, y, len(codes) * width, height)
+        if visible is None:
+            return
+        top, bottom, left, right = visible
+        rows = np.arange(top, bottom) * GLYPH_ROWS // height
+        columns = np.arange(left, right) * GLYPH_COLUMNS // width
+        self._blit(canvas, x + left, y + top, strip[rows][:, columns], reverse)
+
+    def _draw_code128(self, canvas, field, text):
+        options = field.barcode.split(b',')
+        height = _numbers(options[1] if len(options) > 1 else b'', (field.bar_height,))[0]
+        interpretation = (options[2].strip().upper() if len(options) > 2 else b'Y') != b'N'
+
+        widths = np.array([int(w) for value in code128_values(text) for w in CODE128_PATTERNS[value]])
+        # Elementy na przemian kreska / przerwa, każdy o szerokości w modułach
+        colors = np.arange(len(widths)) % 2 == 0
+        bars = np.repeat(colors, widths * max(field.module_width, 1))
+        self._blit(canvas, field.x, field.y, np.broadcast_to(bars, (max(height, 1), len(bars))), field.reverse)
+        if interpretation:
+            text_height = max(field.module_width * 9, 10)
+            text_width = text_height * 5 // 7
+            text_x = field.x + max((len(bars) - len(text) * text_width) // 2, 0)
+            self._draw_text(canvas, text_x, field.y + height + 2, text, text_height, text_width)
+
+    def _draw_box(self, canvas, field, params):
+        fields = params.split(b',')
+        thickness = _numbers(fields[2] if len(fields) > 2 else b'', (1,))[0]
+        width, height = _numbers(b','.join(fields[:2]), (thickness, thickness))
+        width, height = max(width, thickness), max(height, thickness)
+        black = not (len(fields) > 3 and fields[3].strip().upper() == b'W')
+
+        # Tylko część ramki mieszcząca się na etykiecie - ^GB może mieć do 32000 punktów
+        visible = self._visible(canvas, field.x, field.y, width, height)
+        if visible is None:
+            return
+        top, bottom, left, right = visible
+        box = np.ones((bottom - top, right - left), dtype=bool)
+        if thickness * 2 < min(width, height):
+            box[
+                max(thickness - top, 0):max(height - thickness - top, 0),
+                max(thickness - left, 0):max(width - thickness - left, 0)
+            ] = False
+        x, y = field.x + left, field.y + top
+        if black:
+            self._blit(canvas, x, y, box, field.reverse)
+        else:
+            self._blit(canvas, x, y, box, clear=True)
+
+    def _draw_graphic(self, canvas, field, reference, magnify_x, magnify_y):
+        if self.graphic_store is None:
+            return
+        reference = reference.strip()
+        if reference.startswith(REFERENCE_PREFIX):
+            name = reference[len(REFERENCE_PREFIX):].decode('ascii', errors='replace')
+        else:
+            name = graphic_name(reference)
+        graphic = self.graphic_store.peek(name)
+        if graphic is None or not graphic.height:
+            return
+        bits = np.unpackbits(np.frombuffer(graphic.data, dtype=np.uint8)[:graphic.height * graphic.bytes_per_row])
+        bitmap = bits.reshape(graphic.height, graphic.width).astype(bool)
+        magnify_x, magnify_y = max(magnify_x, 1), max(magnify_y, 1)
+        visible = self._visible(canvas, field.x, field.y, graphic.width * magnify_x, graphic.height * magnify_y)
+        if visible is None:
+            return
+        top, bottom, left, right = visible
+        rows = np.arange(top, bottom) // magnify_y
+        columns = np.arange(left, right) // magnify_x
+        self._blit(canvas, field.x + left, field.y + top, bitmap[rows][:, columns], field.reverse)
+
+    @staticmethod
+    def _visible(canvas, x, y, width, height):
+        """Widoczny fragment elementu width x height w (x, y): (góra, dół, lewo, prawo) we własnych
+        współrzędnych elementu albo None - skalowane bitmapy budowane są tylko w tym zakresie"""
+        canvas_height, canvas_width = canvas.shape
+        top, left = max(-y, 0), max(-x, 0)
+        bottom, right = min(height, canvas_height - y), min(width, canvas_width - x)
+        if top >= bottom or left >= right:
+            return None
+        return top, bottom, left, right
+
+    @staticmethod
+    def _blit(canvas, x, y, bitmap, reverse=False, clear=False):
+        # Przycięcie do granic etykiety - pola wychodzące poza etykietę są obcinane
+        height, width = canvas.shape
+        if x >= width or y >= height:
+            return
+        left, top = max(-x, 0), max(-y, 0)
+        bitmap = bitmap[top:height - y, left:width - x]
+        region = canvas[y + top:y + top + bitmap.shape[0], x + left:x + left + bitmap.shape[1]]
+        if clear:
+            region &= ~bitmap
+        elif reverse:
+            region ^= bitmap
+        else:
+            region |= bitmap
+
+
+class PreviewCache:
+    """Ostatnie formaty indeksowane skrótem zawartości i ich wyrenderowane podglądy PNG
+
+    Format zapamiętywany jest przy każdym zadaniu (bez kopiowania - to ten sam
+    obiekt bytes co ramka), a renderowany dopiero przy pierwszym żądaniu
+    podglądu. Łączny rozmiar ramek i obrazów ograniczony jest do max_bytes.
+    """
+
+    def __init__(self, renderer, max_bytes=DEFAULT_PREVIEW_CACHE_BYTES):
+        self.renderer = renderer
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, digest, payload):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return
+            self._entries[digest] = [payload, None]
+            self.bytes_used += len(payload)
+            self._evict()
+
+    def png(self, digest):
+        """Podgląd PNG zadania lub None, gdy ramka została już usunięta z pamięci"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self._entries.move_to_end(digest)
+            payload, image = entry
+            if image is not None:
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        image = encode_png(self.renderer.render(payload))
+        with self._lock:
+            if self._entries.get(digest) is entry and entry[1] is None:
+                entry[1] = image
+                self.bytes_used += len(image)
+                self._evict()
+        return image
+
+    def _evict(self):
+        while self.bytes_used > self.max_bytes and len(self._entries) > 1:
+            _, (payload, image) = self._entries.popitem(last=False)
+            self.bytes_used -= len(payload) + (len(image) if image is not None else 0)
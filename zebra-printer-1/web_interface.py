@@ -0,0 +1,270 @@
+# zebra-printer-1/web_interface.py
+# Interfejs web i API HTTP drukarki - importowany tylko, gdy HTTP jest włączone (nie w trybie headless)
+import gzip
+import logging
+import time
+
+from flask import Flask, Response, jsonify, request
+from waitress import serve
+
+from metrics import OPENMETRICS_CONTENT_TYPE
+from renderer import DEFAULT_PREVIEW_CACHE_BYTES, LabelRenderer, PreviewCache, renderer_available
+from zpl_stream import FRAME_FORMAT
+
+logger = logging.getLogger(__name__)
+
+MAX_JOBS_PAGE = 500
+# Strumień /api/status/stream: maksymalny czas oczekiwania na zmianę i odstęp komentarzy keepalive
+STATUS_STREAM_POLL = 1.0
+STATUS_STREAM_KEEPALIVE = 15.0
+# Kompresja gzip odpowiedzi tekstowych (strona, JSON, metryki) od tego rozmiaru
+GZIP_MIN_SIZE = 512
+GZIP_MIMETYPES = ('text/html', 'application/json', 'text/plain', 'application/openmetrics-text')
+
+
+def create_preview_cache(printer, max_bytes=None):
+    """Pamięć podglądów etykiet; None, gdy NumPy nie jest zainstalowany lub max_bytes=0"""
+    if max_bytes is None:
+        max_bytes = DEFAULT_PREVIEW_CACHE_BYTES
+    if not max_bytes or not renderer_available():
+        return None
+    renderer = LabelRenderer(
+        printer.dpi,
+        int(printer.label_width * printer.dpi),
+        int(printer.label_length * printer.dpi),
+        printer.graphic_store
+    )
+    return PreviewCache(renderer, max_bytes)
+
+
+def create_web_app(printer):
+    app = Flask(__name__)
+    # Szablon kompilowany raz przy starcie, a nie przy każdym wyświetleniu strony
+    template = app.jinja_env.get_template('interface.html')
+
+    @app.route('/')
+    def index():
+        # Adresy API względem script_root - strona działa też pod /printers/<nazwa>/ w trybie floty
+        return template.render(printer=printer, script_root=request.script_root)
+
+    @app.route('/api/status')
+    def api_status():
+        # Słaby ETag z epoki uruchomienia i wersji obrazu statusu - niezmieniony stan to 304 bez treści
+        snapshot = printer.status_snapshot()
+        if request.if_none_match.contains_weak(snapshot.etag):
+            response = Response(status=304)
+        else:
+            response = Response(snapshot.json, mimetype='application/json')
+        response.set_etag(snapshot.etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @app.route('/api/status/stream')
+    def api_status_stream():
+        if printer.max_status_streams is not None and printer.status_listeners >= printer.max_status_streams:
+            response = jsonify({'error': 'Too many status streams, poll /api/status instead'})
+            response.headers['Retry-After'] = str(int(STATUS_STREAM_KEEPALIVE))
+            return response, 503
+        last_event_id = request.headers.get('Last-Event-ID')
+        return Response(
+            status_events(printer, last_event_id),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    @app.after_request
+    def compress_response(response):
+        return gzip_response(response)
+
+    @app.route('/api/reset', methods=['POST'])
+    def api_reset():
+        printer.reset()
+        return jsonify({'message': 'Printer reset successfully'})
+
+    @app.route('/pstprnt', methods=['POST'])
+    def pstprnt():
+        results = printer.process_http_batch(request.stream)
+        formats = [
+            {
+                'id': record.id,
+                'response': response.decode('utf-8', errors='replace').strip() if response else None,
+                'ok': not (response or b'').startswith(b'ERROR')
+            }
+            for record, response in results
+            if record.kind == FRAME_FORMAT
+        ]
+        host_responses = b''.join(
+            response for record, response in results
+            if record.kind != FRAME_FORMAT and response
+        )
+        return jsonify({
+            'formats': formats,
+            'format_count': len(formats),
+            'failed': sum(1 for result in formats if not result['ok']),
+            'host_responses': host_responses.decode('utf-8', errors='replace'),
+            'labels_printed': printer.total_labels_printed
+        })
+
+    @app.route('/api/metrics')
+    def api_metrics():
+        return Response(printer.render_metrics(), content_type=OPENMETRICS_CONTENT_TYPE)
+
+    @app.route('/api/jobs')
+    def api_jobs():
+        cursor = request.args.get('cursor', type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_JOBS_PAGE)
+        records, next_cursor = printer.job_history.page(cursor, limit)
+        return jsonify({
+            'jobs': [record.to_dict() for record in records],
+            'next_cursor': next_cursor,
+            'capacity': printer.job_history.capacity,
+            'total_recorded': printer.job_history.total_recorded
+        })
+
+    @app.route('/api/jobs/<int:job_id>')
+    def api_job(job_id):
+        record = printer.job_history.get(job_id)
+        if record is None:
+            return jsonify({'error': f'Job {job_id} not found'}), 404
+        return jsonify(record.to_dict())
+
+    @app.route('/api/jobs/<int:job_id>/preview.png')
+    def api_job_preview(job_id):
+        if printer.previews is None:
+            return jsonify({'error': 'Label previews are disabled (NumPy not installed)'}), 501
+        record = printer.job_history.get(job_id)
+        if record is None or record.kind != FRAME_FORMAT:
+            return jsonify({'error': f'Label {job_id} not found'}), 404
+        # Grafiki ^XG mogły zostać zapisane przez inny proces (--workers)
+        printer.sync_stored_objects()
+        image = printer.previews.png(record.digest)
+        if image is None:
+            return jsonify({'error': f'Label {job_id} is no longer in the preview cache'}), 404
+        return Response(image, mimetype='image/png', headers={'Cache-Control': 'max-age=3600'})
+
+    @app.route('/api/formats', methods=['GET'])
+    def api_formats():
+        printer.sync_stored_objects()
+        store = printer.format_store
+        return jsonify({
+            'formats': [{'name': name, 'size': size} for name, size in store.items()],
+            'bytes_used': store.bytes_used,
+            'max_bytes': store.max_bytes,
+            'hits': store.hits,
+            'misses': store.misses,
+            'evictions': store.evictions,
+            'expanded_bytes': store.expanded_bytes
+        })
+
+    @app.route('/api/formats', methods=['DELETE'])
+    def api_formats_clear():
+        printer.clear_formats()
+        return jsonify({'message': 'Stored formats cleared'})
+
+    @app.route('/api/graphics')
+    def api_graphics():
+        printer.sync_stored_objects()
+        store = printer.graphic_store
+        return jsonify({
+            'graphics': [
+                {
+                    'name': name,
+                    'size': size,
+                    'width': graphic.width,
+                    'height': graphic.height,
+                    'encoding': graphic.encoding
+                }
+                for name, size, graphic in (
+                    (name, size, store.peek(name)) for name, size in store.items()
+                )
+                if graphic is not None
+            ],
+            'bytes_used': store.bytes_used,
+            'max_bytes': store.max_bytes,
+            'inline_bytes_used': store.inline.bytes_used,
+            'inline_max_bytes': store.inline.max_bytes,
+            'decoded': store.decoded,
+            'errors': store.errors
+        })
+
+    @app.route('/api/faults', methods=['GET'])
+    def api_faults():
+        return jsonify(printer.faults.profile)
+
+    @app.route('/api/faults', methods=['PUT', 'POST'])
+    def api_faults_update():
+        try:
+            changes = request.get_json(force=True)
+            profile = printer.faults.update({} if changes is None else changes)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        logger.info(f"Fault profile updated for {printer.name}: {profile}")
+        return jsonify(profile)
+
+    @app.route('/api/faults', methods=['DELETE'])
+    def api_faults_reset():
+        return jsonify(printer.faults.reset())
+
+    return app
+
+
+def serve_web_app(printer, port):
+    """Serwer HTTP drukarki - waitress z własną pulą wątków albo serwer deweloperski Flaska"""
+    if printer.web_server == 'development':
+        printer.web_app.run(host='0.0.0.0', port=port, debug=False)
+        return
+    # Osobna pula wątków HTTP - żądania WWW nie zajmują wątków obsługi portu 9100
+    logger.info(f"Serving web interface with waitress on port {port} ({printer.web_threads} threads)")
+    serve(printer.web_app, host='0.0.0.0', port=port, threads=printer.web_threads, ident=None)
+
+
+def status_events(printer, last_event_id=None):
+    """Strumień SSE /api/status/stream - zdarzenie tylko po zmianie wersji stanu
+
+    Bez zmian wysyłany jest co STATUS_STREAM_KEEPALIVE sekund komentarz
+    podtrzymujący połączenie. W trybie --workers zmiany zachodzą w innych
+    procesach, więc wersja sprawdzana jest też co STATUS_STREAM_POLL sekund.
+    """
+    with printer.status_changed:
+        printer.status_listeners += 1
+    try:
+        last_version = last_event_id
+        idle = 0.0
+        while True:
+            snapshot = printer.status_snapshot()
+            if snapshot.etag != last_version:
+                last_version = snapshot.etag
+                idle = 0.0
+                yield b"id: " + snapshot.etag.encode('ascii') + b"\ndata: " + snapshot.json + b"\n\n"
+            elif idle >= STATUS_STREAM_KEEPALIVE:
+                idle = 0.0
+                yield b": keepalive\n\n"
+
+            with printer.status_changed:
+                if printer.current_state_etag == last_version:
+                    started = time.monotonic()
+                    printer.status_changed.wait(STATUS_STREAM_POLL)
+                    idle += time.monotonic() - started
+    finally:
+        with printer.status_changed:
+            printer.status_listeners -= 1
+
+
+def gzip_response(response):
+    """Kompresuje gzip-em tekstowe odpowiedzi, jeśli klient to akceptuje (bez strumieni SSE i obrazów)"""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype not in GZIP_MIMETYPES
+        or 'Content-Encoding' in response.headers
+        or not request.accept_encodings['gzip']
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,65 @@
+# zebra-printer-1/zpl_commands.py
+# Tokenizer komend ZPL i kontekst przetwarzania jednej ramki
+import re
+
+# Prefiks ^ lub ~ i dwuznakowy mnemonik (np. ^FO, ~HS, ^A0 - czcionka 0)
+COMMAND_PATTERN = re.compile(rb'([\^~])([A-Za-z0-9@]{2})')
+
+# Tekst bez prefiksu sprawdzany pod kątem PING - tylko krótki początek ramki
+PLAIN_TEXT_SCAN_LIMIT = 64
+
+
+def tokenize(payload):
+    """Dzieli ramkę na tekst wiodący i listę komend (prefiks, mnemonik, parametry)
+
+    Mnemonik zwracany jest wielkimi literami, parametry jako bajty aż do
+    początku następnej komendy.
+    """
+    commands = []
+    matches = COMMAND_PATTERN.finditer(payload)
+
+    previous = next(matches, None)
+    if previous is None:
+        return payload, commands
+
+    leading = payload[:previous.start()]
+    for match in matches:
+        commands.append(_make_command(previous, payload[previous.end():match.start()]))
+        previous = match
+    commands.append(_make_command(previous, payload[previous.end():]))
+
+    return leading, commands
+
+
+def _make_command(match, params):
+    return match.group(1), match.group(2).decode('ascii').upper(), params
+
+
+class ZplContext:
+    """Stan przetwarzania jednej ramki przekazywany do handlerów komend"""
+
+    __slots__ = (
+        'payload', 'in_format', 'format_started', 'responses', 'label_length', 'print_speed',
+        'download_name', 'download', 'recall', 'field_number', 'fields', 'batch'
+    )
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.in_format = False
+        self.format_started = False
+        self.responses = []
+        # Parametry etykiety z ^LL / ^PR - None oznacza wartości z konfiguracji drukarki
+        self.label_length = None
+        self.print_speed = None
+        # ^DF - nazwa i komendy zapisywanego formatu
+        self.download_name = None
+        self.download = None
+        # ^XF - przywołany szablon (False, gdy nie znaleziono) oraz dane pól ^FN
+        self.recall = None
+        self.field_number = None
+        self.fields = None
+        # ^PQ / ^SN - ilość etykiet i numeracja seryjna (None = jedna etykieta)
+        self.batch = None
+
+    def respond(self, response):
+        self.responses.append(response)
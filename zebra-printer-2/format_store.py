@@ -0,0 +1,61 @@
+# zebra-printer-2/format_store.py
+# Pamięć formatów zapisanych przez ^DF (dysk R:) z ograniczeniem rozmiaru i wypieraniem LRU
+from lru_store import ByteLruStore
+from zpl_commands import tokenize
+
+DEFAULT_STORE_BYTES = 1024 * 1024
+DEFAULT_DRIVE = b'R:'
+DEFAULT_EXTENSION = b'.ZPL'
+
+
+def format_name(params):
+    """Nazwa obiektu z parametrów ^DF/^XF, np. b'label' -> 'R:LABEL.ZPL'"""
+    name = params.split(b',', 1)[0].strip().upper()
+    if b':' not in name:
+        name = DEFAULT_DRIVE + name
+    if b'.' not in name:
+        name += DEFAULT_EXTENSION
+    return name.decode('ascii', errors='replace')
+
+
+def merge_fields(template, fields):
+    """Wstawia dane pól ^FN do zapisanego formatu
+
+    ^FD następujące po ^FNn w szablonie otrzymuje wartość pola n; pola
+    bez danych zachowują wartość domyślną z szablonu.
+    """
+    _, commands = tokenize(template)
+    parts = []
+    field_number = None
+    for prefix, mnemonic, params in commands:
+        if mnemonic == 'FN':
+            field_number = params.strip()
+        elif mnemonic == 'FD' and field_number is not None:
+            params = fields.get(field_number, params)
+            field_number = None
+        elif mnemonic == 'FS' and field_number is not None:
+            # ^FN bez ^FD w szablonie - pole zawiera tylko przekazane dane
+            if field_number in fields:
+                parts.append(b'^FD' + fields[field_number])
+            field_number = None
+        parts.append(prefix + mnemonic.encode('ascii') + params)
+    return b''.join(parts)
+
+
+class FormatStore(ByteLruStore):
+    """Zapisane formaty indeksowane nazwą, łączny rozmiar ograniczony do max_bytes
+
+    Odczyt (^XF) przesuwa format na koniec kolejki LRU; po przekroczeniu
+    limitu usuwane są najdawniej używane formaty.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_STORE_BYTES):
+        super().__init__(max_bytes)
+        self.expanded_bytes = 0
+
+    def recall(self, name):
+        template = super().recall(name)
+        if template is not None:
+            with self._lock:
+                self.expanded_bytes += len(template)
+        return template
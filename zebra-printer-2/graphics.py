@@ -0,0 +1,352 @@
+# zebra-printer-2/graphics.py
+# Strumieniowe dekodery grafik ~DG / ^GF (hex, ACS, Z64, B64, binarne) i ograniczona pamięć grafik
+import binascii
+import hashlib
+import re
+import struct
+import zlib
+
+from lru_store import ByteLruStore
+
+DEFAULT_GRAPHIC_STORE_BYTES = 4 * 1024 * 1024
+# Osobny limit dla ^GF - anonimowe grafiki z etykiet nie wypierają nazwanych ~DG
+DEFAULT_INLINE_GRAPHIC_STORE_BYTES = 1024 * 1024
+INLINE_GRAPHIC_PREFIX = 'GF:'
+GRAPHIC_EXTENSION = b'.GRF'
+
+# Odwołanie do zdekodowanej grafiki wstawiane do ramki w miejsce danych ^GF
+REFERENCE_PREFIX = b':REF:'
+
+# Kompresja ACS: G-Y = 1-19 powtórzeń, g-z = 20-400, "," dopełnia wiersz zerami,
+# "!" jedynkami, ":" powtarza poprzedni wiersz
+ACS_TOKEN = re.compile(rb'([0-9A-Fa-f]+)|([G-Yg-z]+)|([,!:])')
+ENCODED_PREFIX_SIZE = 5
+CRC_SIZE = 4
+
+# Zapis grafiki do dziennika obiektów (--workers): bajty na wiersz, długość nazwy kodowania
+PACKED_HEADER = struct.Struct('<IB')
+
+
+class GraphicError(Exception):
+    pass
+
+
+class Graphic:
+    """Zdekodowana bitmapa 1-bit - bytes_per_row bajtów na wiersz, bit 1 = punkt czarny"""
+
+    __slots__ = ('name', 'bytes_per_row', 'data', 'encoding')
+
+    def __init__(self, name, bytes_per_row, data, encoding):
+        self.name = name
+        self.bytes_per_row = bytes_per_row
+        self.data = data
+        self.encoding = encoding
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def width(self):
+        return self.bytes_per_row * 8
+
+    @property
+    def height(self):
+        return len(self.data) // self.bytes_per_row if self.bytes_per_row else 0
+
+    def pack(self):
+        encoding = (self.encoding or '').encode('ascii')
+        return PACKED_HEADER.pack(self.bytes_per_row, len(encoding)) + encoding + self.data
+
+    @classmethod
+    def unpack(cls, name, packed):
+        bytes_per_row, encoding_size = PACKED_HEADER.unpack_from(packed)
+        start = PACKED_HEADER.size + encoding_size
+        encoding = packed[PACKED_HEADER.size:start].decode('ascii') or None
+        return cls(name, bytes_per_row, packed[start:], encoding)
+
+
+def graphic_name(params):
+    """Nazwa obiektu ~DG/^XG, np. b'logo' -> 'R:LOGO.GRF'"""
+    name = params.split(b',', 1)[0].strip().upper()
+    if b':' not in name:
+        name = b'R:' + name
+    if b'.' not in name:
+        name += GRAPHIC_EXTENSION
+    return name.decode('ascii', errors='replace')
+
+
+def _parse_int(value):
+    try:
+        return int(value.strip())
+    except ValueError:
+        raise GraphicError(f"Invalid graphic header value: {value!r}")
+
+
+class GraphicDecoder:
+    """Dekoduje dane grafiki przekazywane fragmentami do jednego bufora o zadeklarowanym rozmiarze
+
+    Format danych ASCII (hex z kompresją ACS albo :Z64:/:B64: z CRC) rozpoznawany
+    jest po pierwszych bajtach. Dla danych binarnych expected_bytes mówi parserowi,
+    ile bajtów należy do grafiki niezależnie od znaków ^ i ~.
+    """
+
+    def __init__(self, name, total_bytes, bytes_per_row, binary=False, expected_bytes=None, max_bytes=None):
+        self.name = name
+        self.total_bytes = total_bytes
+        self.bytes_per_row = bytes_per_row
+        self.binary = binary
+        self.expected_bytes = expected_bytes if binary else None
+        self.error = None
+        self.encoding = 'binary' if binary else None
+        self._out = None
+        self._pos = 0
+        self._half = None
+        self._count = 0
+        self._prefix = b''
+        self._base64_tail = b''
+        self._crc = 0
+        self._crc_text = None
+        self._inflater = None
+
+        if total_bytes <= 0 or bytes_per_row <= 0:
+            self.error = 'invalid'
+        elif max_bytes is not None and total_bytes > max_bytes:
+            self.error = 'too_large'
+        else:
+            self._out = bytearray(total_bytes)
+
+    def feed(self, data):
+        if self.error:
+            return
+        if self.binary:
+            self._write(data)
+            return
+        if self.encoding is None:
+            data = self._detect_encoding(data)
+            if not data:
+                return
+        if self.encoding == 'hex':
+            self._feed_hex(data)
+        else:
+            self._feed_encoded(data)
+
+    def finish(self):
+        """Kończy dekodowanie i zwraca Graphic; błędne dane zgłaszane są jako GraphicError"""
+        if self.encoding is None and not self.error:
+            # Krótkie dane, które nie zdążyły wypełnić prefiksu - traktowane jako hex
+            self.encoding = 'hex'
+            self._feed_hex(self._prefix)
+        if not self.error and self.encoding in ('z64', 'b64'):
+            self._finish_encoded()
+        if self.error:
+            raise GraphicError(self.error)
+        return Graphic(self.name, self.bytes_per_row, self._out, self.encoding)
+
+    def _detect_encoding(self, data):
+        self._prefix += bytes(data)
+        stripped = self._prefix.lstrip()
+        if not stripped or (stripped[:1] == b':' and len(stripped) < ENCODED_PREFIX_SIZE):
+            return b''
+        if stripped[:ENCODED_PREFIX_SIZE] in (b':Z64:', b':B64:'):
+            self.encoding = stripped[1:4].decode('ascii').lower()
+            if self.encoding == 'z64':
+                self._inflater = zlib.decompressobj()
+            data = stripped[ENCODED_PREFIX_SIZE:]
+        else:
+            self.encoding = 'hex'
+            data = self._prefix
+        self._prefix = b''
+        return data
+
+    def _write(self, data):
+        end = self._pos + len(data)
+        if end > self.total_bytes:
+            self.error = 'overflow'
+            return
+        self._out[self._pos:end] = data
+        self._pos = end
+
+    def _fill(self, value, count):
+        if count > 0:
+            self._write(bytes((value,)) * count)
+
+    def _feed_hex(self, data):
+        for match in ACS_TOKEN.finditer(data):
+            digits, counts, control = match.groups()
+            if digits:
+                self._hex_digits(digits)
+            elif counts:
+                for char in counts:
+                    self._count += char - 70 if char <= 89 else (char - 102) * 20
+            else:
+                self._control(control)
+            if self.error:
+                return
+
+    def _hex_digits(self, digits):
+        if self._count:
+            # Licznik ACS dotyczy tylko pierwszej cyfry
+            self._repeat_nibble(int(digits[:1], 16), self._count)
+            self._count = 0
+            digits = digits[1:]
+        if self._half is not None and digits:
+            self._write(bytes(((self._half << 4) | int(digits[:1], 16),)))
+            self._half = None
+            digits = digits[1:]
+        even = len(digits) & ~1
+        if even:
+            self._write(binascii.unhexlify(digits[:even]))
+        if len(digits) > even:
+            self._half = int(digits[-1:], 16)
+
+    def _repeat_nibble(self, nibble, count):
+        if self._half is not None:
+            self._write(bytes(((self._half << 4) | nibble,)))
+            self._half = None
+            count -= 1
+        self._fill((nibble << 4) | nibble, count // 2)
+        if count % 2:
+            self._half = nibble
+
+    def _control(self, control):
+        row_remaining = -self._pos % self.bytes_per_row
+        if control == b':':
+            if self._pos >= self.bytes_per_row and row_remaining == 0 and self._half is None:
+                start = self._pos - self.bytes_per_row
+                self._write(bytes(self._out[start:self._pos]))
+            return
+        value = 0xFF if control == b'!' else 0x00
+        if self._half is not None:
+            self._write(bytes(((self._half << 4) | (value & 0x0F),)))
+            self._half = None
+            row_remaining = -self._pos % self.bytes_per_row
+        elif row_remaining == 0:
+            # Na początku wiersza znak wypełnia cały wiersz
+            row_remaining = self.bytes_per_row
+        self._fill(value, row_remaining)
+        self._count = 0
+
+    def _feed_encoded(self, data):
+        if self._crc_text is not None:
+            self._crc_text += bytes(data).strip()
+            return
+        data = bytes(data)
+        end = data.find(b':')
+        if end >= 0:
+            self._crc_text = data[end + 1:].strip()
+            data = data[:end]
+        data = b''.join(data.split())
+        self._crc = binascii.crc_hqx(data, self._crc)
+
+        # Base64 dekodowany w blokach po 4 znaki, reszta czeka na kolejny fragment
+        data = self._base64_tail + data
+        usable = len(data) & ~3
+        self._base64_tail = data[usable:]
+        if usable:
+            try:
+                self._decoded(binascii.a2b_base64(data[:usable]))
+            except binascii.Error:
+                self.error = 'invalid'
+
+    def _decoded(self, data):
+        if self._inflater is None:
+            self._write(data)
+            return
+        try:
+            # max_length - dane rozpakowywane najwyżej do zadeklarowanego rozmiaru grafiki
+            self._write(self._inflater.decompress(data, self.total_bytes - self._pos + 1))
+        except zlib.error:
+            self.error = 'invalid'
+
+    def _finish_encoded(self):
+        if self._base64_tail:
+            try:
+                self._decoded(binascii.a2b_base64(self._base64_tail + b'=' * (-len(self._base64_tail) % 4)))
+            except binascii.Error:
+                self.error = 'invalid'
+        if self._inflater is not None and not self.error:
+            try:
+                self._write(self._inflater.flush())
+            except zlib.error:
+                self.error = 'invalid'
+        if self._crc_text is not None and not self.error:
+            try:
+                expected = int(self._crc_text[:CRC_SIZE], 16)
+            except ValueError:
+                expected = None
+            if expected != self._crc:
+                self.error = 'crc_mismatch'
+
+
+class GraphicStore(ByteLruStore):
+    """Grafiki ~DG (nazwane) w pamięci LRU i ^GF (indeksowane skrótem zawartości) w osobnej
+
+    ^GF zapisywane są tylko po to, żeby podgląd etykiety mógł rozwiązać
+    odwołanie z ramki, więc mają własny limit inline_max_bytes.
+
+    Pełni rolę odbiorcy parsera strumienia: begin() tworzy dekoder dla
+    nagłówka komendy, finish() zapisuje wynik i zwraca bajty wstawiane do
+    ramki w miejsce danych grafiki.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_GRAPHIC_STORE_BYTES, on_error=None, on_store=None,
+                 inline_max_bytes=DEFAULT_INLINE_GRAPHIC_STORE_BYTES):
+        super().__init__(max_bytes)
+        self.inline = ByteLruStore(inline_max_bytes)
+        self.on_error = on_error
+        # Wywoływany dla zapisanych grafik ~DG - ^GF nie są udostępniane innym procesom
+        self.on_store = on_store
+        self.decoded = 0
+        self.errors = {}
+
+    def begin(self, command, header):
+        """Dekoder dla nagłówka ~DG (nazwa,rozmiar,bajty na wiersz) albo ^GF (a,b,c,d)"""
+        fields = header.split(b',')
+        try:
+            if command == b'~DG':
+                name = graphic_name(fields[0])
+                return GraphicDecoder(name, _parse_int(fields[1]), _parse_int(fields[2]), max_bytes=self.max_bytes)
+
+            compression = fields[0].strip().upper() or b'A'
+            binary = compression in (b'B', b'C')
+            decoder = GraphicDecoder(
+                None,
+                _parse_int(fields[2]),
+                _parse_int(fields[3]),
+                binary=binary,
+                expected_bytes=_parse_int(fields[1]),
+                max_bytes=self.inline.max_bytes
+            )
+            if compression == b'C':
+                # Kompresja binarna Zebra nie jest obsługiwana - dane są pomijane
+                decoder.error = 'unsupported'
+            return decoder
+        except (GraphicError, IndexError):
+            return None
+
+    def finish(self, decoder):
+        try:
+            graphic = decoder.finish()
+        except GraphicError as e:
+            self.errors[str(e)] = self.errors.get(str(e), 0) + 1
+            if self.on_error:
+                self.on_error(f"Graphic {decoder.name or '^GF'} rejected: {e}")
+            return b''
+
+        self.decoded += 1
+        if graphic.name is None:
+            graphic.name = INLINE_GRAPHIC_PREFIX + hashlib.blake2b(graphic.data, digest_size=8).hexdigest()
+            self.inline.store(graphic.name, graphic)
+            return REFERENCE_PREFIX + graphic.name.encode('ascii')
+        if self.store(graphic.name, graphic) and self.on_store:
+            self.on_store(graphic)
+        return b''
+
+    def peek(self, name):
+        """Grafika bez zmiany kolejności LRU i liczników (np. do podglądu etykiety)"""
+        if name.startswith(INLINE_GRAPHIC_PREFIX):
+            return self.inline.peek(name)
+        return super().peek(name)
+
+    def items(self):
+        return super().items() + self.inline.items()
@@ -0,0 +1,97 @@
+# zebra-printer-2/job_history.py
+# Historia zadań o stałej pojemności (bufor cykliczny)
+import hashlib
+import threading
+import time
+
+DEFAULT_CAPACITY = 1000
+PREVIEW_SIZE = 120
+
+
+def payload_digest(payload):
+    """Skrót zawartości ramki - identyfikuje identyczne etykiety (np. w cache podglądów)"""
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class JobRecord:
+    __slots__ = ('id', 'timestamp', 'kind', 'size', 'digest', 'preview', 'truncated', 'response')
+
+    def __init__(self, job_id, kind, payload, response, preview_size=PREVIEW_SIZE):
+        self.id = job_id
+        self.timestamp = time.time()
+        self.kind = kind
+        self.size = len(payload)
+        self.digest = payload_digest(payload)
+        self.preview = payload[:preview_size].decode('utf-8', errors='ignore')
+        self.truncated = self.size > preview_size
+        self.response = response.decode('utf-8', errors='ignore') if response else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp,
+            'kind': self.kind,
+            'size': self.size,
+            'digest': self.digest,
+            'preview': self.preview,
+            'truncated': self.truncated,
+            'response': self.response
+        }
+
+
+class JobHistory:
+    """Ostatnie `capacity` ramek - starsze wpisy są nadpisywane, więc pamięć pozostaje stała
+
+    Identyfikatory rosną monotonicznie i służą jako kursor paginacji:
+    strona zawiera wpisy o id mniejszym niż kursor, od najnowszych.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, preview_size=PREVIEW_SIZE):
+        if capacity < 1:
+            raise ValueError(f"Job history capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.preview_size = preview_size
+        self._records = [None] * capacity
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def total_recorded(self):
+        return self._next_id - 1
+
+    def record(self, kind, payload, response):
+        # Skrót i podgląd liczone poza blokadą - pod blokadą tylko przydział id i slotu
+        record = JobRecord(0, kind, payload, response, self.preview_size)
+        with self._lock:
+            record.id = self._next_id
+            self._next_id += 1
+            self._records[record.id % self.capacity] = record
+        return record
+
+    def get(self, job_id):
+        record = self._records[job_id % self.capacity]
+        if record is None or record.id != job_id:
+            return None
+        return record
+
+    def page(self, cursor=None, limit=50):
+        """Zwraca (lista wpisów od najnowszego, kursor następnej strony lub None)"""
+        with self._lock:
+            newest = self._next_id - 1
+        oldest = max(1, newest - self.capacity + 1)
+
+        start = newest if cursor is None else min(cursor - 1, newest)
+        records = []
+        job_id = start
+        while job_id >= oldest and len(records) < limit:
+            record = self.get(job_id)
+            if record is not None:
+                records.append(record)
+            job_id -= 1
+
+        next_cursor = records[-1].id if records and job_id >= oldest else None
+        return records, next_cursor
+
+    def clear(self):
+        with self._lock:
+            self._records = [None] * self.capacity
@@ -0,0 +1,64 @@
+# zebra-printer-2/lru_store.py
+# Pamięć LRU ograniczona łącznym rozmiarem wartości - podstawa pamięci formatów i grafik
+import threading
+from collections import OrderedDict
+
+
+class ByteLruStore:
+    """Wartości indeksowane nazwą, łączny rozmiar (len) ograniczony do max_bytes
+
+    Odczyt przez recall() przesuwa wpis na koniec kolejki LRU; po
+    przekroczeniu limitu usuwane są najdawniej używane wpisy.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def store(self, name, value):
+        """Zapisuje wartość; zwraca False, gdy sama wartość przekracza limit pamięci"""
+        if len(value) > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.pop(name, None)
+            if previous is not None:
+                self.bytes_used -= len(previous)
+            self._entries[name] = value
+            self.bytes_used += len(value)
+            while self.bytes_used > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= len(evicted)
+                self.evictions += 1
+        return True
+
+    def recall(self, name):
+        with self._lock:
+            value = self._entries.get(name)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        return value
+
+    def peek(self, name):
+        """Wartość bez zmiany kolejności LRU i liczników"""
+        with self._lock:
+            return self._entries.get(name)
+
+    def items(self):
+        with self._lock:
+            return [(name, len(value)) for name, value in self._entries.items()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
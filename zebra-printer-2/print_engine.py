@@ -0,0 +1,130 @@
+# zebra-printer-2/print_engine.py
+# Symulacja mechanizmu drukującego - ograniczona kolejka zadań i czas druku zależny od prędkości
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENGINE_READY = 'READY'
+ENGINE_PRINTING = 'PRINTING'
+ENGINE_PAUSED = 'PAUSED'
+
+
+class PrintJob:
+    __slots__ = ('copies', 'label_length', 'print_speed', 'submitted_at')
+
+    def __init__(self, copies, label_length, print_speed):
+        self.copies = copies
+        self.label_length = label_length
+        self.print_speed = print_speed
+        self.submitted_at = time.monotonic()
+
+    @property
+    def duration(self):
+        """Czas druku w sekundach: długość etykiety (cale) / prędkość (cale/s) na kopię"""
+        return self.copies * self.label_length / self.print_speed
+
+
+class PrintEngine:
+    """Wątek "drukujący" zadania z ograniczonej kolejki (bufora odbiorczego drukarki)
+
+    Zadanie przyjęte przy pełnym buforze jest odrzucane, a pauza (~PP)
+    wstrzymuje druk kolejnych etykiet do wznowienia (~PS), jak w prawdziwej
+    drukarce.
+    """
+
+    def __init__(self, print_speed, label_length, queue_size=64,
+                 on_job_printed=None, on_state_change=None):
+        self.print_speed = print_speed
+        self.label_length = label_length
+        self.queue_size = queue_size
+        self._on_job_printed = on_job_printed
+        self._on_state_change = on_state_change
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._printing = 0
+        self._state = ENGINE_READY
+        self._worker = None
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+
+    @property
+    def depth(self):
+        """Liczba zadań w buforze łącznie z aktualnie drukowanym"""
+        return self._queue.qsize() + self._printing
+
+    @property
+    def buffer_full(self):
+        return self._queue.full()
+
+    def start(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name='print-engine', daemon=True)
+            self._worker.start()
+
+    def submit(self, copies=1, label_length=None, print_speed=None):
+        """Dodaje zadanie do bufora; zwraca False, gdy bufor jest pełny"""
+        job = PrintJob(
+            copies,
+            label_length or self.label_length,
+            print_speed or self.print_speed
+        )
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            return False
+        return True
+
+    def pause(self):
+        self._resumed.clear()
+        self._set_state(ENGINE_PAUSED)
+
+    def resume(self):
+        self._resumed.set()
+        self._set_state(ENGINE_PRINTING if self.depth else ENGINE_READY)
+
+    def cancel_all(self):
+        """~JA - usuwa wszystkie oczekujące zadania z bufora"""
+        cancelled = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            cancelled += 1
+        return cancelled
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            self._printing = 1
+            self._resumed.wait()
+            self._set_state(ENGINE_PRINTING)
+
+            time.sleep(job.duration)
+
+            self._printing = 0
+            if self._on_job_printed:
+                try:
+                    self._on_job_printed(job)
+                except Exception as e:
+                    logger.error(f"Print engine callback error: {e}")
+
+            if self._queue.empty() and not self.paused:
+                self._set_state(ENGINE_READY)
+
+    def _set_state(self, state):
+        if state == self._state:
+            return
+        self._state = state
+        if self._on_state_change:
+            self._on_state_change(state)
@@ -0,0 +1,179 @@
+# zebra-printer-2/replay.py
+# Odtwarzanie nagranego ruchu ZPL na dowolny port 9100 (mock, rpi-server, prawdziwa drukarka)
+import argparse
+import asyncio
+import logging
+import time
+
+from capture import RECORD_CLOSE, RECORD_DATA, RECORD_OPEN, RECORD_SESSION, read_capture
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLOSE = None
+
+
+class ReplayStats:
+    def __init__(self):
+        self.connections = 0
+        self.failed_connections = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.started = time.monotonic()
+
+    def summary(self):
+        duration = time.monotonic() - self.started
+        return (
+            f"connections={self.connections} failed={self.failed_connections} "
+            f"sent={self.bytes_sent}B received={self.bytes_received}B "
+            f"duration={duration:.2f}s throughput={self.bytes_sent / duration if duration else 0:.0f}B/s"
+        )
+
+
+class CaptureReplayer:
+    """Odtwarza plik przechwytywania z zachowaniem odstępów czasu
+
+    speed=1 odtwarza w czasie rzeczywistym, speed=N N razy szybciej,
+    speed=0 bez żadnych opóźnień. Każde nagrane połączenie otwierane jest
+    jako osobne połączenie TCP, a max_connections ogranicza liczbę
+    jednocześnie otwartych. Rekord RECORD_SESSION (restart mocka) zamyka
+    połączenia poprzedniego uruchomienia i pomija przerwę przed nim.
+    """
+
+    def __init__(self, path, host, port, speed=1.0, max_connections=100, max_gap=None, connect_timeout=10):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.max_gap = max_gap
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self._slots = None
+        self.stats = ReplayStats()
+
+    async def run(self):
+        # Semafor tworzony wewnątrz pętli zdarzeń (Python 3.9 wiąże go z bieżącą pętlą)
+        self._slots = asyncio.Semaphore(self.max_connections)
+        connections = {}
+        tasks = []
+        replay_start = time.monotonic()
+        capture_offset = 0.0
+        previous_timestamp = None
+
+        for timestamp, connection_id, record_type, data in read_capture(self.path):
+            if record_type == RECORD_SESSION:
+                # Kolejne uruchomienie mocka - te same id oznaczają już inne połączenia,
+                # a przerwa między uruchomieniami nie jest odtwarzana
+                for queue in connections.values():
+                    queue.put_nowait(CLOSE)
+                connections.clear()
+                previous_timestamp = timestamp
+                continue
+
+            # Czas nagrania przeliczony na czas odtwarzania (z opcjonalnym skracaniem przerw)
+            if previous_timestamp is not None:
+                gap = max(timestamp - previous_timestamp, 0.0)
+                if self.max_gap is not None:
+                    gap = min(gap, self.max_gap)
+                capture_offset += gap
+            previous_timestamp = timestamp
+
+            if self.speed > 0:
+                delay = replay_start + capture_offset / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if record_type == RECORD_OPEN or connection_id not in connections:
+                if connection_id in connections:
+                    connections[connection_id].put_nowait(CLOSE)
+                queue = asyncio.Queue()
+                connections[connection_id] = queue
+                tasks.append(asyncio.ensure_future(self.replay_connection(queue)))
+
+            if record_type == RECORD_DATA:
+                connections[connection_id].put_nowait(data)
+            elif record_type == RECORD_CLOSE:
+                connections.pop(connection_id).put_nowait(CLOSE)
+
+        for queue in connections.values():
+            queue.put_nowait(CLOSE)
+        await asyncio.gather(*tasks)
+        return self.stats
+
+    async def replay_connection(self, queue):
+        async with self._slots:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port),
+                    timeout=self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self.stats.failed_connections += 1
+                logger.warning(f"Connection to {self.host}:{self.port} failed: {e}")
+                await self._drain_queue(queue)
+                return
+
+            self.stats.connections += 1
+            drain_task = asyncio.ensure_future(self._discard_responses(reader))
+            try:
+                while True:
+                    data = await queue.get()
+                    if data is CLOSE:
+                        break
+                    writer.write(data)
+                    self.stats.bytes_sent += len(data)
+                    await writer.drain()
+                if writer.can_write_eof():
+                    writer.write_eof()
+                # Odczyt odpowiedzi do zamknięcia połączenia przez serwer (bez RST)
+                await asyncio.wait_for(asyncio.shield(drain_task), timeout=self.connect_timeout)
+            except asyncio.TimeoutError:
+                pass
+            except OSError as e:
+                logger.warning(f"Replay connection error: {e}")
+                await self._drain_queue(queue)
+            finally:
+                writer.close()
+                drain_task.cancel()
+
+    async def _discard_responses(self, reader):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    return
+                self.stats.bytes_received += len(data)
+        except (OSError, asyncio.CancelledError):
+            return
+
+    @staticmethod
+    async def _drain_queue(queue):
+        # Konsumuje resztę rekordów połączenia, żeby dispatcher nie gromadził danych
+        while await queue.get() is not CLOSE:
+            pass
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay a ZPL capture against a port-9100 target')
+    parser.add_argument('capture', help='Capture file recorded with PRINTER_CAPTURE_FILE')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--speed', type=float, default=1.0, help='1 = real time, N = N times faster, 0 = max speed')
+    parser.add_argument('--connections', type=int, default=100, help='Max parallel connections')
+    parser.add_argument('--max-gap', type=float, default=None, help='Cap idle gaps between records (seconds)')
+    return parser.parse_args()
+
+
+# Main execution
+if __name__ == '__main__':
+    args = parse_args()
+    replayer = CaptureReplayer(
+        args.capture,
+        args.host,
+        args.port,
+        speed=args.speed,
+        max_connections=args.connections,
+        max_gap=args.max_gap
+    )
+    stats = asyncio.run(replayer.run())
+    logger.info(f"Replay finished: {stats.summary()}")
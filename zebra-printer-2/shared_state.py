@@ -0,0 +1,183 @@
+# zebra-printer-2/shared_state.py
+# Stan drukarki współdzielony przez procesy robocze (--workers) w pamięci współdzielonej
+import ctypes
+import json
+import multiprocessing
+import struct
+import threading
+
+# Kolejność odpowiada priorytetowi przy agregacji - wygrywa "najgorszy" status
+STATUS_CODES = ('READY', 'PRINTING', 'PAUSED', 'ERROR')
+
+# Pola wiersza jednego procesu roboczego
+JOBS = 0
+STATUS = 1
+QUEUE_DEPTH = 2
+BUFFER_FULL = 3
+ACTIVE_CONNECTIONS = 4
+CONNECTIONS = 5
+BYTES_RECEIVED = 6
+JOBS_REJECTED = 7
+LABELS = 8
+STATE_VERSION = 9
+FIELDS = 10
+
+# Miejsce na profil błędów w JSON - zwalidowany profil zajmuje kilkaset bajtów
+FAULT_PROFILE_BYTES = 4096
+
+# Rekord dziennika obiektów: rodzaj, wiersz procesu, długość nazwy, długość treści
+OBJECT_HEADER = struct.Struct('<BHHI')
+STORED_FORMAT = 0
+STORED_GRAPHIC = 1
+CLEARED_FORMATS = 2
+
+
+class SharedPrinterState:
+    """Jeden wiersz liczników na proces w RawArray, bez blokad
+
+    Każdy proces zapisuje wyłącznie swój wiersz, a odczyt (proces nadrzędny
+    z /api/status albo ~HS w dowolnym procesie) sumuje wiersze. Po wierszach
+    procesów roboczych jest wiersz procesu nadrzędnego (zadania z /pstprnt)
+    i ostatni wiersz z punktem odniesienia liczników zadań i etykiet
+    ustawianym przez /api/reset.
+
+    Profil błędów zapisuje tylko proces nadrzędny (/api/faults). Wersja
+    profilu jest nieparzysta w trakcie zapisu, a czytający powtarza odczyt,
+    gdy wersja zmieniła się w międzyczasie.
+    """
+
+    def __init__(self, workers, context=None, journal_bytes=0):
+        context = context or multiprocessing.get_context('fork')
+        self.workers = workers
+        # Wiersz procesu nadrzędnego; wiersze sumowane to procesy robocze i nadrzędny
+        self.parent_index = workers
+        self.rows = workers + 1
+        self._slots = context.RawArray(ctypes.c_longlong, (self.rows + 1) * FIELDS)
+        self._fault_version = context.RawValue(ctypes.c_longlong, 0)
+        self._fault_profile = context.RawArray(ctypes.c_char, FAULT_PROFILE_BYTES)
+        # Wątki serwera web procesu nadrzędnego - jeden zapis profilu naraz
+        self._fault_lock = threading.Lock()
+        self.objects = ObjectJournal(journal_bytes, context)
+
+    def publish(self, worker_index, state_version, jobs, labels, status, queue_depth, buffer_full, active_connections):
+        row = worker_index * FIELDS
+        slots = self._slots
+        slots[row + STATE_VERSION] = state_version
+        slots[row + JOBS] = jobs
+        slots[row + LABELS] = labels
+        slots[row + STATUS] = STATUS_CODES.index(status) if status in STATUS_CODES else 0
+        slots[row + QUEUE_DEPTH] = queue_depth
+        slots[row + BUFFER_FULL] = 1 if buffer_full else 0
+        slots[row + ACTIVE_CONNECTIONS] = active_connections
+
+    def publish_counters(self, worker_index, connections, bytes_received, jobs_rejected):
+        row = worker_index * FIELDS
+        slots = self._slots
+        slots[row + CONNECTIONS] = connections
+        slots[row + BYTES_RECEIVED] = bytes_received
+        slots[row + JOBS_REJECTED] = jobs_rejected
+
+    def total(self, field):
+        slots = self._slots
+        return sum(slots[index * FIELDS + field] for index in range(self.rows))
+
+    @property
+    def jobs_printed(self):
+        return self.total(JOBS) - self._slots[self.rows * FIELDS + JOBS]
+
+    @property
+    def labels_printed(self):
+        return self.total(LABELS) - self._slots[self.rows * FIELDS + LABELS]
+
+    @property
+    def status(self):
+        slots = self._slots
+        return STATUS_CODES[max(slots[index * FIELDS + STATUS] for index in range(self.rows))]
+
+    @property
+    def buffer_full(self):
+        return self.total(BUFFER_FULL) > 0
+
+    def reset_jobs(self):
+        baseline = self.rows * FIELDS
+        self._slots[baseline + JOBS] = self.total(JOBS)
+        self._slots[baseline + LABELS] = self.total(LABELS)
+
+    @property
+    def fault_version(self):
+        return self._fault_version.value
+
+    def publish_fault_profile(self, profile):
+        encoded = json.dumps(profile).encode('utf-8')
+        if len(encoded) >= FAULT_PROFILE_BYTES:
+            raise ValueError("Fault profile too large")
+        with self._fault_lock:
+            self._fault_version.value += 1
+            self._fault_profile.raw = encoded + b'\0'
+            self._fault_version.value += 1
+
+    def read_fault_profile(self):
+        """(wersja, profil) z ostatniego pełnego zapisu; profil None, gdy nie był publikowany"""
+        while True:
+            version = self._fault_version.value
+            if version % 2:
+                continue
+            encoded = self._fault_profile.value
+            if self._fault_version.value == version:
+                return version, json.loads(encoded) if version else None
+
+
+class ObjectJournal:
+    """Dziennik obiektów zapisanych w pamięci drukarki (^DF, ~DG) przez dowolny proces
+
+    Każdy proces dopisuje zapisane przez siebie obiekty, a przed ich
+    odczytem wczytuje rekordy dopisane przez inne procesy do swoich
+    pamięci - ^DF i ^XF mogą trafić do różnych procesów roboczych.
+    Zapełniony dziennik zaczyna się od początku w nowej generacji;
+    rekordy niewczytane przed nadpisaniem przepadają jak wyparte z LRU.
+    """
+
+    def __init__(self, size, context):
+        self.size = size
+        self._data = context.RawArray(ctypes.c_char, max(size, 1))
+        self._generation = context.RawValue(ctypes.c_longlong, 0)
+        self._end = context.RawValue(ctypes.c_longlong, 0)
+        self._lock = context.Lock()
+
+    @property
+    def cursor(self):
+        return self._generation.value, self._end.value
+
+    def append(self, kind, origin, name, payload=b''):
+        encoded = name.encode('utf-8')
+        record = OBJECT_HEADER.pack(kind, origin, len(encoded), len(payload)) + encoded + payload
+        if len(record) > self.size:
+            return False
+        with self._lock:
+            end = self._end.value
+            if end + len(record) > self.size:
+                self._generation.value += 1
+                end = 0
+            ctypes.memmove(ctypes.addressof(self._data) + end, record, len(record))
+            self._end.value = end + len(record)
+        return True
+
+    def read_since(self, cursor):
+        """Rekordy (rodzaj, wiersz procesu, nazwa, treść) dopisane od cursor i nowy kursor"""
+        generation, offset = cursor
+        with self._lock:
+            if generation != self._generation.value:
+                generation, offset = self._generation.value, 0
+            end = self._end.value
+            data = ctypes.string_at(ctypes.addressof(self._data) + offset, end - offset)
+
+        records = []
+        pos = 0
+        while pos < len(data):
+            kind, origin, name_size, payload_size = OBJECT_HEADER.unpack_from(data, pos)
+            pos += OBJECT_HEADER.size
+            name = data[pos:pos + name_size].decode('utf-8')
+            pos += name_size
+            records.append((kind, origin, name, data[pos:pos + payload_size]))
+            pos += payload_size
+        return (generation, end), records
@@ -0,0 +1,101 @@
+# zebra-printer-2/startup_benchmark.py
+# Pomiar czasu startu mocka drukarki - tryb headless (tylko port 9100) i pełny (z interfejsem web)
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = ('headless', 'full')
+
+# Kod procesu potomnego: import, utworzenie drukarki, start serwera socket i oczekiwanie
+# na pierwsze przyjęte połączenie, a potem count kolejnych instancji (jak w trybie floty)
+CHILD_SCRIPT = '''
+import json, socket, sys, threading, time
+started = time.perf_counter()
+import zebra_mock
+imported = time.perf_counter()
+printer = zebra_mock.ZebraPrinterMock('BENCH', 'ZT230', host='127.0.0.1', port={port}, headless={headless})
+created = time.perf_counter()
+threading.Thread(target=printer.socket_server_target(), daemon=True).start()
+while True:
+    try:
+        socket.create_connection(('127.0.0.1', {port}), timeout=1).close()
+        break
+    except OSError:
+        time.sleep(0.001)
+ready = time.perf_counter()
+fleet_started = time.perf_counter()
+fleet = [zebra_mock.ZebraPrinterMock(f'BENCH-{{i}}', 'ZT230', port=0, headless={headless}) for i in range({count})]
+fleet_created = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'ready_ms': (ready - started) * 1000,
+    'per_instance_ms': (fleet_created - fleet_started) * 1000 / max({count}, 1)
+}}))
+sys.stdout.flush()
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure(mode, count):
+    """Jeden pomiar w świeżym interpreterze; total_ms - cały proces potomny od uruchomienia do wyjścia"""
+    script = CHILD_SCRIPT.format(port=free_port(), headless=mode == 'headless', count=count)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True
+    )
+    total_ms = (time.perf_counter() - started) * 1000
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample['total_ms'] = total_ms
+    return sample
+
+
+def run_benchmark(modes=MODES, runs=5, count=100):
+    """Mediany pomiarów dla każdego trybu: {tryb: {metryka: ms}}"""
+    results = {}
+    for mode in modes:
+        samples = [measure(mode, count) for _ in range(runs)]
+        results[mode] = {
+            key: round(statistics.median(sample[key] for sample in samples), 3)
+            for key in samples[0]
+        }
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure printer mock startup time (headless vs full)')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreter runs per mode')
+    parser.add_argument('--count', type=int, default=100, help='Extra instances created in-process per run')
+    parser.add_argument('--mode', choices=MODES, action='append', help='Mode to measure (default: both)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    return parser.parse_args()
+
+
+# Main execution
+if __name__ == '__main__':
+    args = parse_args()
+    results = run_benchmark(args.mode or MODES, args.runs, args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'mode':<10}{'import':>10}{'create':>10}{'ready':>10}{'total':>10}{'instance':>10}  (ms, median of {args.runs})")
+        for mode, values in results.items():
+            print(
+                f"{mode:<10}{values['import_ms']:>10.1f}{values['create_ms']:>10.2f}"
+                f"{values['ready_ms']:>10.1f}{values['total_ms']:>10.1f}{values['per_instance_ms']:>10.3f}"
+            )
@@ -0,0 +1,43 @@
+# zebra-printer-2/status_snapshot.py
+# Niezmienny obraz statusu drukarki z gotowymi odpowiedziami ~HS, ~HI, ~HQES, ^WD i /api/status
+import json
+
+# Zapytania tylko odczytujące stan - ramka złożona wyłącznie z nich nie zmienia wersji stanu
+QUERY_COMMANDS = frozenset(('HS', 'HI', 'HQ', 'WD'))
+
+
+def state_etag(epoch, version):
+    """ETag i id zdarzenia SSE - losowa epoka uruchomienia odróżnia wersje sprzed restartu"""
+    return f"{epoch}-{version}"
+
+
+class StatusSnapshot:
+    """Status drukarki w jednej wersji stanu, zakodowany raz przy budowie
+
+    Pola odczytywane są razem pod blokadą stanu, więc ~HS, ~HI i /api/status
+    z tej samej wersji pokazują te same wartości. Obiekt nie jest zmieniany
+    po utworzeniu - nowa wersja stanu to nowy obiekt podmieniany jednym
+    przypisaniem, a odczyt to porównanie wersji i zwrócenie gotowych bajtów.
+    """
+
+    __slots__ = (
+        'version', 'etag', 'payload', 'json',
+        'host_status', 'host_identification', 'host_query', 'configuration'
+    )
+
+    def __init__(self, version, payload, available, configuration, epoch=''):
+        self.version = version
+        self.etag = state_etag(epoch, version)
+        self.payload = payload
+        self.json = json.dumps(payload).encode('utf-8')
+        self.host_status = (
+            f"STATUS:{payload['status']},JOBS:{payload['jobs_printed']},"
+            f"QUEUE:{payload['queue_depth']},BUFFER_FULL:{int(payload['buffer_full'])}\n".encode('utf-8')
+        )
+        self.host_identification = f"{payload['name']},{payload['model']},V1.0,12345,READY\n".encode('utf-8')
+        # ~HQES - stan błędów i ostrzeżeń drukarki
+        self.host_query = (
+            f"PRINTER STATUS\r\nERRORS: {0 if available else 1} 00000000 00000000\r\n"
+            f"WARNINGS: 0 00000000 00000000\r\n".encode('utf-8')
+        )
+        self.configuration = configuration.encode('utf-8')
@@ -1,124 +1,1003 @@
 # zebra-printer-2/zebra_mock.py
 # Identyczny plik jak zebra-printer-1/zebra_mock.py
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import resource
+import signal
 import socket
+import struct
+import sys
 import threading
 import time
 import json
 import os
+from collections import deque
 from datetime import datetime
-from flask import Flask, jsonify, request, render_template_string
 import logging
 
+from capture import CaptureWriter
+from faults import FaultInjector, load_profile_setting
+from format_store import DEFAULT_STORE_BYTES, FormatStore, format_name, merge_fields
+from graphics import (
+    DEFAULT_GRAPHIC_STORE_BYTES, DEFAULT_INLINE_GRAPHIC_STORE_BYTES, Graphic, GraphicStore, graphic_name
+)
+from job_history import DEFAULT_CAPACITY, JobHistory
+from label_batch import LabelBatch
+from metrics import OpenMetricsWriter, ShardedCounter, ShardedHistogram
+from print_engine import PrintEngine
+from shared_state import (
+    ACTIVE_CONNECTIONS, BYTES_RECEIVED, CLEARED_FORMATS, CONNECTIONS, JOBS_REJECTED, QUEUE_DEPTH, STATE_VERSION,
+    STORED_FORMAT, STORED_GRAPHIC, SharedPrinterState
+)
+from status_snapshot import QUERY_COMMANDS, StatusSnapshot, state_etag
+from zpl_commands import PLAIN_TEXT_SCAN_LIMIT, ZplContext, tokenize
+from zpl_stream import FORMAT_START, FRAME_FORMAT, ZplStreamParser
+
 # Konfiguracja loggingu
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+SERVER_MODES = ('threaded', 'asyncio')
+# Serwer HTTP: waitress (pula wątków, produkcyjnie) albo serwer deweloperski Flaska
+WEB_SERVERS = ('waitress', 'development')
+DEFAULT_WEB_THREADS = 16
+CONNECTION_MODES = ('keepalive', 'close', 'halfclose')
+PRINT_ENGINE_MODES = ('instant', 'timed')
+RECV_BUFFER_SIZE = 4096
+# Fragmenty treści żądania /pstprnt przekazywane do parsera
+HTTP_READ_SIZE = 64 * 1024
+LAST_COMMAND_PREVIEW = 200
+# SO_LINGER z zerowym czasem - close() wysyła RST zamiast FIN
+LINGER_RESET = struct.pack('ii', 1, 0)
+MAX_ERROR_MESSAGES = 100
+
+# Statusy, w których drukarka przyjmuje zadania (metryka printer_available)
+AVAILABLE_STATUSES = ('READY', 'PRINTING')
+
+# Komendy formatujące etykietę, które mock akceptuje bez odpowiedzi
+LABEL_COMMANDS = (
+    'FO', 'FT', 'FB', 'FH', 'FR', 'FW', 'FX', 'FV',
+    'BY', 'BC', 'B3', 'BE', 'BQ', 'BX', 'GB', 'GC', 'GD', 'GE', 'GF',
+    'CF', 'CI', 'LH', 'LR', 'LS', 'LT', 'PW', 'PO',
+    'PM', 'MD', 'MM', 'MN', 'MT', 'SF', 'IM',
+    'DG', 'DY', 'ID', 'JB', 'JM', 'JU', 'SD', 'CC', 'CT', 'CD',
+)
+
+# Komendy z jednoliterowym mnemonikiem i parametrem w drugim znaku (^A0 = czcionka 0)
+COMMAND_FAMILIES = ('A',)
+
+
 class ZebraPrinterMock:
-    def __init__(self, name, model, host='0.0.0.0', port=9100):
+    def __init__(self, name, model, host='0.0.0.0', port=9100,
+                 server_mode='threaded', max_connections=10000, backlog=1024,
+                 print_engine='instant', job_queue_size=64, job_history_size=DEFAULT_CAPACITY,
+                 capture_file=None, fault_profile=None, connection_mode='keepalive', idle_timeout=None,
+                 shared_state=None, worker_index=None, format_store_size=DEFAULT_STORE_BYTES,
+                 graphic_store_size=DEFAULT_GRAPHIC_STORE_BYTES,
+                 inline_graphic_store_size=DEFAULT_INLINE_GRAPHIC_STORE_BYTES, preview_cache_size=None,
+                 web_server='waitress', web_threads=DEFAULT_WEB_THREADS, max_status_streams=None, headless=False):
+        if server_mode not in SERVER_MODES:
+            raise ValueError(f"Unknown server mode: {server_mode}")
+        if connection_mode not in CONNECTION_MODES:
+            raise ValueError(f"Unknown connection mode: {connection_mode}")
+        if print_engine not in PRINT_ENGINE_MODES:
+            raise ValueError(f"Unknown print engine mode: {print_engine}")
+        if web_server not in WEB_SERVERS:
+            raise ValueError(f"Unknown web server: {web_server}")
+
         self.name = name
         self.model = model
         self.host = host
         self.port = port
+        self.server_mode = server_mode
+        self.max_connections = max_connections
+        self.backlog = backlog
+        self.connection_mode = connection_mode
+        self.web_server = web_server
+        self.web_threads = web_threads
+        # Strumień SSE zajmuje wątek serwera przez cały czas połączenia - część puli
+        # zostaje dla zwykłych żądań, nadmiarowe strumienie dostają 503
+        if max_status_streams is None and web_server == 'waitress':
+            max_status_streams = max(web_threads // 2, 1)
+        self.max_status_streams = max_status_streams
+        self.idle_timeout = idle_timeout or None
+        # shared_state bez worker_index - proces nadrzędny: agreguje stan procesów roboczych
+        # i publikuje we własnym wierszu zadania przyjęte przez /pstprnt
+        self.shared_state = shared_state
+        self.worker_index = worker_index
+        self.state_row = None
+        if shared_state is not None:
+            self.state_row = shared_state.parent_index if worker_index is None else worker_index
+        self.active_connections = 0
+        self._connection_ids = itertools.count(1)
+        self._connections_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        # Wersja stanu widocznego w /api/status - zmieniana przy każdej zmianie stanu
+        self._state_versions = itertools.count(1)
+        self.state_version = 0
+        # Wersje liczone są od zera po każdym starcie - ETag z poprzedniego uruchomienia nie może pasować
+        self.boot_epoch = os.urandom(4).hex()
+        self.status_changed = threading.Condition()
+        self.status_listeners = 0
         self.status = 'READY'
+        self.fault_status = None
         self.jobs_printed = 0
+        # Etykiety (kopie ^PQ) - zadanie to jeden format, etykiet może być wiele
+        self.labels_printed = 0
+        self.label_pauses = 0
+        self.last_serial = None
+        self.dpi = 203
+        self.label_width = 4.0
+        self.label_length = 6.0
+        self.print_speed = 2.0
         self.last_command = None
-        self.error_messages = []
-        self.web_app = Flask(__name__)
-        self.setup_web_routes()
-
-    def setup_web_routes(self):
-        @self.web_app.route('/')
-        def index():
-            return render_template_string(WEB_INTERFACE_TEMPLATE, printer=self)
-
-        @self.web_app.route('/api/status')
-        def api_status():
-            return jsonify({
-                'name': self.name,
-                'model': self.model,
-                'status': self.status,
-                'jobs_printed': self.jobs_printed,
-                'last_command': self.last_command,
-                'timestamp': datetime.now().isoformat()
-            })
-
-        @self.web_app.route('/api/reset', methods=['POST'])
-        def api_reset():
+        self.unknown_commands = ShardedCounter()
+        self.command_counter = ShardedCounter()
+        self.bytes_received = ShardedCounter()
+        self.connections_total = ShardedCounter()
+        self.idle_connections_reaped = ShardedCounter()
+        self.http_batches = ShardedCounter()
+        self.http_bytes_received = ShardedCounter()
+        self.command_latency = ShardedHistogram()
+        self.jobs_rejected = ShardedCounter()
+        self.error_messages = deque(maxlen=MAX_ERROR_MESSAGES)
+        self.job_history = JobHistory(job_history_size)
+        self.format_store = FormatStore(format_store_size)
+        self.graphic_store = GraphicStore(
+            graphic_store_size,
+            on_error=self.record_error,
+            on_store=self.on_graphic_stored,
+            inline_max_bytes=inline_graphic_store_size
+        )
+        # Pozycja w dzienniku obiektów (--workers) wczytana do pamięci tego procesu
+        self._objects_cursor = (0, 0)
+        self._objects_lock = threading.Lock()
+        self.capture = CaptureWriter(capture_file) if capture_file else None
+        # Wersja profilu błędów z pamięci współdzielonej wczytana przez proces roboczy
+        self._fault_version = 0
+        self.faults = FaultInjector(
+            fault_profile,
+            on_status_change=self.on_fault_status_change,
+            on_profile_change=self.on_fault_profile_change
+        )
+        self.print_engine = None
+        if print_engine == 'timed':
+            self.print_engine = PrintEngine(
+                self.print_speed,
+                self.label_length,
+                queue_size=job_queue_size,
+                on_job_printed=self.on_job_printed,
+                on_state_change=self.on_engine_state_change
+            )
+            self.print_engine.start()
+        self.command_handlers = self.build_command_handlers()
+        # Obraz statusu dla ~HS/~HI/^WD i /api/status - budowany najwyżej raz na wersję stanu
+        self._snapshot_lock = threading.Lock()
+        self._status_snapshot = self.build_status_snapshot(self.current_state_version)
+
+        # Tryb headless - tylko port 9100; Flask, Jinja, Werkzeug i NumPy nie są importowane
+        self.headless = headless
+        self.previews = None
+        self.web_app = None
+        if not headless:
+            from web_interface import create_preview_cache, create_web_app
+            # Podglądy etykiet wymagają NumPy; bez niego lub z preview_cache_size=0 są wyłączone
+            self.previews = create_preview_cache(self, preview_cache_size)
+            self.web_app = create_web_app(self)
+
+    def reset(self):
+        """Reset drukarki (/api/reset) - czyści bufor, liczniki zadań i błędy"""
+        if self.print_engine:
+            self.print_engine.cancel_all()
+            self.print_engine.resume()
+        with self._state_lock:
             self.jobs_printed = 0
-            self.error_messages.clear()
+            self.labels_printed = 0
+            self.label_pauses = 0
+            self.last_serial = None
             self.status = 'READY'
-            return jsonify({'message': 'Printer reset successfully'})
+        if self.shared_state is not None:
+            # Wyzerowany wiersz tego procesu przed ustawieniem punktu odniesienia
+            self.publish_state()
+            self.shared_state.reset_jobs()
+        self.unknown_commands.reset()
+        self.error_messages.clear()
+        self.state_changed()
+
+    def _acquire_connection(self, address):
+        """Rejestruje nowe połączenie; zwraca jego id lub None po przekroczeniu limitu"""
+        self.sync_fault_profile()
+        with self._connections_lock:
+            if self.active_connections >= self.max_connections:
+                logger.warning(f"Connection limit ({self.max_connections}) reached, rejecting {address}")
+                return None
+            self.active_connections += 1
+        self.connections_total.inc()
+        self.publish_state()
+
+        connection_id = next(self._connection_ids)
+        if self.capture:
+            self.capture.open_connection(connection_id)
+        return connection_id
+
+    def _release_connection(self, connection_id):
+        with self._connections_lock:
+            self.active_connections -= 1
+        self.publish_state()
+        self.publish_counters()
+        if self.capture:
+            self.capture.close_connection(connection_id)
 
     def handle_client(self, client_socket, address):
+        connection_id = self._acquire_connection(address)
+        if connection_id is None:
+            client_socket.close()
+            return
+
         logger.info(f"Connection from {address}")
+        parser = ZplStreamParser(self.graphic_store)
+        recv_buffer = memoryview(bytearray(RECV_BUFFER_SIZE))
+        read_size = RECV_BUFFER_SIZE
+        # halfclose: odpowiedzi wysyłane dopiero po zamknięciu strony zapisu przez klienta
+        deferred = []
         try:
+            # Wewnątrz try - błąd ustawień gniazda nie może pominąć zamknięcia i zwolnienia połączenia
+            slow_reader = self.faults.slow_reader()
+            if slow_reader:
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(slow_reader['receive_buffer']))
+                read_size = min(int(slow_reader['read_size']), RECV_BUFFER_SIZE)
+            if self.idle_timeout:
+                client_socket.settimeout(self.idle_timeout)
+
+            if self.faults.should_blackhole():
+                # Połączenie przyjęte, ale bez żadnej odpowiedzi
+                while client_socket.recv_into(recv_buffer):
+                    pass
+                return
+
             while True:
-                data = client_socket.recv(1024)
-                if not data:
+                received = client_socket.recv_into(recv_buffer, read_size)
+                if not received:
                     break
 
-                command = data.decode('utf-8', errors='ignore')
-                logger.info(f"Received command: {command[:100]}...")
+                data = recv_buffer[:received]
+                if self.should_inject_reset(parser, data):
+                    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, LINGER_RESET)
+                    logger.info(f"Injected connection reset for {address}")
+                    return
+
+                response = self.process_stream_data(parser, data, connection_id)
+                if response and self.connection_mode == 'halfclose':
+                    deferred.append(response)
+                elif response:
+                    delay = self.faults.response_delay()
+                    if delay:
+                        time.sleep(delay)
+                    client_socket.sendall(response)
+                    if self.connection_mode == 'close':
+                        client_socket.shutdown(socket.SHUT_WR)
+                        return
+
+                if slow_reader:
+                    time.sleep(float(slow_reader['read_pause']))
 
-                response = self.process_zebra_command(command)
-                if response:
-                    client_socket.send(response.encode('utf-8'))
+            deferred.append(self.process_frames(parser.flush()))
+            response = b''.join(deferred)
+            if response:
+                client_socket.sendall(response)
+            client_socket.shutdown(socket.SHUT_WR)
 
+        except socket.timeout:
+            self.reap_idle_connection(address)
         except Exception as e:
-            logger.error(f"Error handling client {address}: {e}")
+            self.record_error(f"Error handling client {address}: {e}")
         finally:
             client_socket.close()
+            self._release_connection(connection_id)
             logger.info(f"Connection closed: {address}")
 
+    async def handle_client_async(self, reader, writer):
+        # Odpowiednik handle_client dla trybu asyncio - jedna korutyna na połączenie
+        address = writer.get_extra_info('peername')
+        connection_id = self._acquire_connection(address)
+        if connection_id is None:
+            writer.close()
+            return
+
+        logger.info(f"Connection from {address}")
+        parser = ZplStreamParser(self.graphic_store)
+        read_size = RECV_BUFFER_SIZE
+        deferred = []
+        try:
+            slow_reader = self.faults.slow_reader()
+            if slow_reader:
+                sock = writer.get_extra_info('socket')
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, int(slow_reader['receive_buffer']))
+                read_size = int(slow_reader['read_size'])
+
+            if self.faults.should_blackhole():
+                while await self.read_with_idle_timeout(reader, RECV_BUFFER_SIZE):
+                    pass
+                return
+
+            while True:
+                data = await self.read_with_idle_timeout(reader, read_size)
+                if not data:
+                    break
+
+                if self.should_inject_reset(parser, data):
+                    writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, LINGER_RESET)
+                    writer.transport.abort()
+                    logger.info(f"Injected connection reset for {address}")
+                    return
+
+                response = self.process_stream_data(parser, data, connection_id)
+                if response and self.connection_mode == 'halfclose':
+                    deferred.append(response)
+                elif response:
+                    delay = self.faults.response_delay()
+                    if delay:
+                        await asyncio.sleep(delay)
+                    writer.write(response)
+                    await writer.drain()
+                    if self.connection_mode == 'close':
+                        writer.write_eof()
+                        return
+
+                if slow_reader:
+                    # Wstrzymanie odczytu z gniazda - nadawca widzi zapełnione okno TCP
+                    writer.transport.pause_reading()
+                    await asyncio.sleep(float(slow_reader['read_pause']))
+                    writer.transport.resume_reading()
+
+            deferred.append(self.process_frames(parser.flush()))
+            response = b''.join(deferred)
+            if response:
+                writer.write(response)
+                await writer.drain()
+            writer.write_eof()
+
+        except asyncio.TimeoutError:
+            self.reap_idle_connection(address)
+        except Exception as e:
+            self.record_error(f"Error handling client {address}: {e}")
+        finally:
+            writer.close()
+            self._release_connection(connection_id)
+            logger.info(f"Connection closed: {address}")
+
+    async def read_with_idle_timeout(self, reader, size):
+        # wait_for tylko przy ustawionym limicie - bez niego odczyt nie tworzy dodatkowego zadania
+        if self.idle_timeout is None:
+            return await reader.read(size)
+        return await asyncio.wait_for(reader.read(size), self.idle_timeout)
+
+    def reap_idle_connection(self, address):
+        self.idle_connections_reaped.inc()
+        logger.info(f"Closing idle connection {address} after {self.idle_timeout}s")
+
+    def should_inject_reset(self, parser, data):
+        """Reset w trakcie zadania - tylko gdy odbierany fragment należy do formatu"""
+        return self.faults.should_reset() and (parser.in_format or FORMAT_START in bytes(data))
+
+    def process_stream_data(self, parser, data, connection_id=0):
+        """Przekazuje fragment strumienia do parsera i zwraca zakodowane odpowiedzi dla kompletnych ramek"""
+        self.bytes_received.inc(amount=len(data))
+        if self.capture:
+            self.capture.data(connection_id, data)
+        self.sync_fault_profile()
+        return self.process_frames(parser.feed(data))
+
+    def record_error(self, message):
+        logger.error(message)
+        self.error_messages.append(f"{datetime.now().isoformat()} {message}")
+        self.state_changed()
+
+    def process_frames(self, frames):
+        responses = []
+        version = self.state_version
+        for kind, frame in frames:
+            _, response = self.process_frame(kind, frame)
+            if response:
+                responses.append(response)
+
+        # Same zapytania o status nie zmieniają stanu - obraz statusu pozostaje aktualny
+        if self.state_version != version:
+            self.state_changed()
+        return b''.join(responses)
+
+    def process_frame(self, kind, frame):
+        """Wykonuje jedną ramkę i zapisuje ją w historii; zwraca (wpis historii, odpowiedź)"""
+        logger.info(f"Received command: {frame[:100].decode('utf-8', errors='ignore')}...")
+
+        started = time.perf_counter()
+        response = self.process_zebra_command(frame)
+        self.command_latency.observe(time.perf_counter() - started)
+        record = self.job_history.record(kind, frame, response)
+        if self.previews is not None and kind == FRAME_FORMAT:
+            self.previews.remember(record.digest, frame)
+        return record, response
+
+    def process_http_batch(self, stream):
+        """Strumień ZPL z żądania HTTP (/pstprnt) przetwarzany tym samym parserem co port 9100
+
+        Treść czytana jest fragmentami, więc paczka tysięcy formatów nie jest
+        buforowana w całości; zwraca wynik każdej ramki w kolejności odbioru.
+        """
+        parser = ZplStreamParser(self.graphic_store)
+        results = []
+        version = self.state_version
+        while True:
+            data = stream.read(HTTP_READ_SIZE)
+            frames = parser.feed(data) if data else parser.flush()
+            if data:
+                self.http_bytes_received.inc(amount=len(data))
+            for kind, frame in frames:
+                record, response = self.process_frame(kind, frame)
+                results.append((record, response))
+            if not data:
+                break
+
+        self.http_batches.inc()
+        if self.state_version != version:
+            self.state_changed()
+        self.publish_counters()
+        return results
+
+    def build_command_handlers(self):
+        """Tablica handlerów komend ZPL indeksowana dwuznakowym mnemonikiem"""
+        handlers = {
+            'XA': self.handle_start_format,
+            'XZ': self.handle_end_format,
+            'HI': self.handle_host_identification,
+            'HS': self.handle_host_status,
+            'HQ': self.handle_host_query,
+            'WD': self.handle_get_configuration,
+            'DF': self.handle_download_format,
+            'XF': self.handle_recall_format,
+            'XG': self.handle_recall_graphic,
+            'FN': self.handle_field_number,
+            'FD': self.handle_field_data,
+            'FS': self.handle_field_separator,
+            'PQ': self.handle_print_quantity,
+            'SN': self.handle_serial_number,
+            'LL': self.handle_label_length,
+            'PR': self.handle_print_rate,
+            'PP': self.handle_pause,
+            'PS': self.handle_resume,
+            'JA': self.handle_cancel_all,
+        }
+        # Komendy formatujące etykietę - akceptowane bez odpowiedzi
+        for mnemonic in LABEL_COMMANDS + COMMAND_FAMILIES:
+            handlers[mnemonic] = self.handle_label_command
+        return handlers
+
     def process_zebra_command(self, command):
-        self.last_command = command
+        if isinstance(command, str):
+            command = command.encode('utf-8')
+
+        leading, commands = tokenize(command)
+        if any(mnemonic not in QUERY_COMMANDS for _, mnemonic, _ in commands):
+            # Tylko początek ramki - pełny payload (np. grafika ~DG) nie jest przetrzymywany
+            self.last_command = command[:LAST_COMMAND_PREVIEW]
+            self.bump_state_version()
+        ctx = ZplContext(command)
+        self.dispatch_commands(ctx, commands)
+
+        if b'PING' in leading[:PLAIN_TEXT_SCAN_LIMIT].upper():
+            ctx.respond(b"PONG\n")
+
+        if ctx.responses:
+            return b''.join(ctx.responses)
+        if ctx.format_started:
+            return None
+        # Inne komendy - symulacja pozytywnej odpowiedzi
+        return b"OK\n"
+
+    def dispatch_commands(self, ctx, commands):
+        handlers = self.command_handlers
+        command_counts = self.command_counter.shard()
 
         # Symulacja różnych komend ZPL
-        if command.startswith('^XA'):  # Start Format
+        for prefix, mnemonic, params in commands:
+            command_counts[mnemonic] = command_counts.get(mnemonic, 0) + 1
+            if ctx.download is not None and mnemonic != 'XZ':
+                # Komendy między ^DF a ^XZ trafiają do zapisywanego formatu zamiast być wykonywane
+                if ctx.download or mnemonic != 'FS':
+                    ctx.download.append(prefix + mnemonic.encode('ascii') + params)
+                continue
+            handler = handlers.get(mnemonic)
+            if handler is None and mnemonic[0] in COMMAND_FAMILIES:
+                handler = handlers[mnemonic[0]]
+            if handler is None:
+                self.handle_unknown_command(ctx, mnemonic)
+                continue
+            handler(ctx, params)
+
+    def handle_start_format(self, ctx, params):
+        ctx.in_format = True
+        ctx.format_started = True
+        if self.print_engine is None:
             self.status = 'PRINTING'
-            return None
 
-        elif command.startswith('^XZ'):  # End Format
+    def handle_end_format(self, ctx, params):
+        ctx.in_format = False
+        if ctx.download is not None:
+            self.finish_download(ctx)
+            return
+
+        if ctx.recall is False:
+            # Nieznany format w ^XF - odpowiedź z błędem wysłana już przez handle_recall_format
+            if self.print_engine is None:
+                self.status = 'READY'
+            return
+        if ctx.recall is not None:
+            template, ctx.recall = ctx.recall, None
+            _, commands = tokenize(merge_fields(template, ctx.fields or {}))
+            self.dispatch_commands(ctx, commands)
+
+        if self.fault_status == 'ERROR':
+            self.jobs_rejected.inc()
+            ctx.respond(b"ERROR: PRINTER ERROR\n")
+            return
+
+        batch = ctx.batch
+        copies = batch.quantity if batch else 1
+        if self.print_engine is None:
+            ctx.respond(self.complete_job(copies))
+        elif not self.print_engine.submit(copies, label_length=ctx.label_length, print_speed=ctx.print_speed):
+            self.jobs_rejected.inc()
+            ctx.respond(b"ERROR: BUFFER FULL\n")
+            return
+        else:
+            self.bump_state_version()
+            ctx.respond(f"JOB QUEUED: {self.print_engine.depth}\n".encode('utf-8'))
+
+        if batch is not None:
+            self.complete_batch(batch)
+
+    def handle_download_format(self, ctx, params):
+        # ^DF - reszta formatu do ^XZ zapisywana jest zamiast drukowana
+        ctx.download_name = format_name(params)
+        ctx.download = []
+
+    def finish_download(self, ctx):
+        name = ctx.download_name
+        template = b''.join(ctx.download)
+        ctx.download = None
+        if self.print_engine is None:
+            self.status = 'READY'
+        if not self.format_store.store(name, template):
+            ctx.respond(f"ERROR: FORMAT TOO LARGE: {name}\n".encode('utf-8'))
+            return
+        self.publish_stored_object(STORED_FORMAT, name, template)
+        ctx.respond(f"FORMAT STORED: {name}\n".encode('utf-8'))
+
+    def handle_recall_format(self, ctx, params):
+        # ^XF - szablon wykonywany przy ^XZ, po zebraniu danych pól ^FN
+        name = format_name(params)
+        self.sync_stored_objects()
+        template = self.format_store.recall(name)
+        if template is None:
+            ctx.recall = False
+            ctx.respond(f"ERROR: FORMAT NOT FOUND: {name}\n".encode('utf-8'))
+            return
+        ctx.recall = template
+
+    def handle_recall_graphic(self, ctx, params):
+        # ^XG - wynik wyszukiwania zliczany w trafieniach/chybieniach pamięci grafik
+        self.sync_stored_objects()
+        self.graphic_store.recall(graphic_name(params))
+
+    def on_graphic_stored(self, graphic):
+        self.publish_stored_object(STORED_GRAPHIC, graphic.name, graphic.pack())
+
+    def clear_formats(self):
+        """Czyści pamięć formatów (DELETE /api/formats) - w trybie --workers we wszystkich procesach"""
+        self.format_store.clear()
+        self.publish_stored_object(CLEARED_FORMATS, '')
+
+    def publish_stored_object(self, kind, name, payload=b''):
+        if self.shared_state is not None:
+            self.shared_state.objects.append(kind, self.state_row, name, payload)
+
+    def sync_stored_objects(self):
+        """Wczytuje formaty i grafiki zapisane przez pozostałe procesy (--workers)"""
+        if self.shared_state is None or self.shared_state.objects.cursor == self._objects_cursor:
+            return
+        with self._objects_lock:
+            self._objects_cursor, records = self.shared_state.objects.read_since(self._objects_cursor)
+            for kind, origin, name, payload in records:
+                if origin == self.state_row:
+                    continue
+                if kind == STORED_FORMAT:
+                    self.format_store.store(name, payload)
+                elif kind == STORED_GRAPHIC:
+                    self.graphic_store.store(name, Graphic.unpack(name, payload))
+                elif kind == CLEARED_FORMATS:
+                    self.format_store.clear()
+
+    def handle_field_number(self, ctx, params):
+        ctx.field_number = params.strip()
+
+    def handle_field_data(self, ctx, params):
+        # Dane pól zbierane tylko w formacie przywołującym szablon (^XF)
+        if ctx.recall and ctx.field_number is not None:
+            if ctx.fields is None:
+                ctx.fields = {}
+            ctx.fields[ctx.field_number] = params
+
+    def handle_field_separator(self, ctx, params):
+        ctx.field_number = None
+
+    def handle_print_quantity(self, ctx, params):
+        if ctx.batch is None:
+            ctx.batch = LabelBatch()
+        ctx.batch.set_quantity(params)
+
+    def handle_serial_number(self, ctx, params):
+        # ^SN zastępuje ^FD - pole z numerem zwiększanym na kolejnych etykietach
+        if ctx.batch is None:
+            ctx.batch = LabelBatch()
+        ctx.batch.add_serial(params)
+
+    def handle_label_length(self, ctx, params):
+        # ^LL - długość etykiety w punktach
+        length = parse_number(params)
+        if length:
+            ctx.label_length = length / self.dpi
+
+    def handle_print_rate(self, ctx, params):
+        # ^PR - prędkość druku w calach na sekundę
+        speed = parse_number(params)
+        if speed:
+            ctx.print_speed = speed
+
+    def handle_pause(self, ctx, params):
+        if self.print_engine:
+            self.print_engine.pause()
+
+    def handle_resume(self, ctx, params):
+        if self.print_engine:
+            self.print_engine.resume()
+
+    def handle_cancel_all(self, ctx, params):
+        if self.print_engine:
+            self.print_engine.cancel_all()
+
+    def handle_host_identification(self, ctx, params):
+        ctx.respond(self.status_snapshot().host_identification)
+
+    def handle_host_status(self, ctx, params):
+        ctx.respond(self.status_snapshot().host_status)
+
+    def handle_host_query(self, ctx, params):
+        ctx.respond(self.status_snapshot().host_query)
+
+    def handle_get_configuration(self, ctx, params):
+        ctx.respond(self.status_snapshot().configuration)
+
+    def handle_label_command(self, ctx, params):
+        pass
+
+    def handle_unknown_command(self, ctx, mnemonic):
+        self.unknown_commands.inc(mnemonic)
+
+    def complete_job(self, copies=1):
+        with self._state_lock:
             self.jobs_printed += 1
+            self.labels_printed += copies
+            jobs_printed = self.jobs_printed
             self.status = 'READY'
-            return f"JOB COMPLETED: {self.jobs_printed}\n"
+            # ~HS w tej samej ramce po ^XZ widzi już nowe zadanie
+            self.state_version = next(self._state_versions)
+        if self.shared_state is not None:
+            # Numer zadania w skali całej drukarki, nie pojedynczego procesu
+            self.publish_state()
+            jobs_printed = self.total_jobs_printed
+        return f"JOB COMPLETED: {jobs_printed}\n".encode('utf-8')
+
+    def complete_batch(self, batch):
+        """Pauzy ^PQ i ostatni numer seryjny formatu - wyliczane, nie symulowane etykieta po etykiecie"""
+        serials = batch.last_serials()
+        with self._state_lock:
+            self.label_pauses += batch.pauses
+            if serials:
+                self.last_serial = serials[-1].decode('ascii', errors='replace')
+
+    def on_job_printed(self, job):
+        with self._state_lock:
+            self.jobs_printed += 1
+            self.labels_printed += job.copies
+        self.state_changed()
+
+    def on_engine_state_change(self, state):
+        with self._state_lock:
+            self.status = state
+        self.state_changed()
+
+    def on_fault_status_change(self, status):
+        # Okresowy status z profilu błędów; PAUSED wstrzymuje też mechanizm drukujący
+        self.fault_status = status
+        if self.print_engine:
+            if status == 'PAUSED':
+                self.print_engine.pause()
+            elif status is None and self.print_engine.paused:
+                self.print_engine.resume()
+        self.state_changed()
+
+    def on_fault_profile_change(self, profile):
+        # Proces nadrzędny przekazuje profil z /api/faults procesom roboczym
+        if self.shared_state is not None and self.worker_index is None:
+            self.shared_state.publish_fault_profile(profile)
+
+    def sync_fault_profile(self):
+        """Proces roboczy przyjmuje profil błędów ustawiony w procesie nadrzędnym"""
+        if self.worker_index is None or self.shared_state.fault_version == self._fault_version:
+            return
+        version, profile = self.shared_state.read_fault_profile()
+        if version != self._fault_version:
+            self._fault_version = version
+            self.faults.update(profile)
+
+    def bump_state_version(self):
+        """Nowa wersja stanu bez publikacji - w trakcie ramki, publikacja po całej paczce"""
+        with self._state_lock:
+            self.state_version = next(self._state_versions)
+
+    def state_changed(self):
+        """Nowa wersja stanu: publikacja dla procesu nadrzędnego i wybudzenie strumieni SSE"""
+        self.bump_state_version()
+        self.publish_state()
+        if self.status_listeners:
+            with self.status_changed:
+                self.status_changed.notify_all()
+
+    def status_payload(self):
+        return {
+            'name': self.name,
+            'model': self.model,
+            'status': self.current_status,
+            'jobs_printed': self.total_jobs_printed,
+            'labels_printed': self.total_labels_printed,
+            'last_serial': self.last_serial,
+            'queue_depth': self.queue_depth,
+            'buffer_full': self.buffer_full,
+            'last_command': self.last_command_text,
+            'unknown_commands': self.unknown_commands.snapshot(),
+            'errors': list(self.error_messages)[-5:],
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def status_snapshot(self):
+        """Aktualny obraz statusu - bez blokad i formatowania, dopóki wersja stanu się nie zmieni"""
+        snapshot = self._status_snapshot
+        version = self.current_state_version
+        if snapshot.version == version:
+            return snapshot
+        with self._snapshot_lock:
+            # Wielu jednoczesnych pytających o nową wersję - budowa tylko raz
+            snapshot = self._status_snapshot
+            if snapshot.version != version:
+                snapshot = self._status_snapshot = self.build_status_snapshot(version)
+        return snapshot
 
-        elif command.startswith('~HI'):  # Host Identification
-            return f"{self.name},{self.model},V1.0,12345,READY\n"
+    def build_status_snapshot(self, version):
+        # Pola odczytywane razem pod blokadą stanu - spójne między sobą
+        with self._state_lock:
+            payload = self.status_payload()
+        return StatusSnapshot(
+            version,
+            payload,
+            payload['status'] in AVAILABLE_STATUSES,
+            self.get_printer_config(),
+            self.boot_epoch
+        )
 
-        elif command.startswith('~HS'):  # Host Status
-            return f"STATUS:{self.status},JOBS:{self.jobs_printed}\n"
+    @property
+    def current_state_etag(self):
+        return state_etag(self.boot_epoch, self.current_state_version)
 
-        elif command.startswith('^WD'):  # Get Configuration
-            return self.get_printer_config()
+    @property
+    def current_state_version(self):
+        if self.shared_state is not None:
+            # Suma opublikowanych wersji wszystkich procesów i bieżącej wersji tego procesu
+            # (zmiana w trakcie ramki widoczna przed publikacją)
+            return self.shared_state.total(STATE_VERSION) + self.state_version
+        return self.state_version
 
-        elif 'PING' in command.upper():
-            return "PONG\n"
+    def publish_state(self):
+        """Zapisuje stan tego procesu do jego wiersza w pamięci współdzielonej"""
+        if self.shared_state is None:
+            return
+        engine = self.print_engine
+        self.shared_state.publish(
+            self.state_row,
+            self.state_version,
+            self.jobs_printed,
+            self.labels_printed,
+            self.fault_status or self.status,
+            engine.depth if engine else 0,
+            engine.buffer_full if engine else False,
+            self.active_connections
+        )
 
+    def publish_counters(self):
+        if self.shared_state is None:
+            return
+        self.shared_state.publish_counters(
+            self.state_row,
+            self.connections_total.value(),
+            self.bytes_received.value(),
+            self.jobs_rejected.value()
+        )
+
+    @property
+    def total_jobs_printed(self):
+        if self.shared_state is not None:
+            return self.shared_state.jobs_printed
+        return self.jobs_printed
+
+    @property
+    def total_labels_printed(self):
+        if self.shared_state is not None:
+            return self.shared_state.labels_printed
+        return self.labels_printed
+
+    @property
+    def current_status(self):
+        if self.shared_state is not None:
+            return self.shared_state.status
+        return self.fault_status or self.status
+
+    @property
+    def queue_depth(self):
+        if self.shared_state is not None:
+            return self.shared_state.total(QUEUE_DEPTH)
+        return self.print_engine.depth if self.print_engine else 0
+
+    @property
+    def buffer_full(self):
+        if self.shared_state is not None:
+            return self.shared_state.buffer_full
+        return self.print_engine.buffer_full if self.print_engine else False
+
+    @property
+    def last_command_text(self):
+        if self.last_command is None:
+            return None
+        return self.last_command.decode('utf-8', errors='ignore')
+
+    def render_metrics(self):
+        """Metryki w formacie OpenMetrics dla Prometheusa (/api/metrics)"""
+        writer = OpenMetricsWriter()
+        self.write_metrics(writer)
+        return writer.render()
+
+    def write_metrics(self, writer):
+        labels = {'printer_name': self.name}
+        if self.shared_state is not None:
+            # Liczniki z pamięci współdzielonej - suma wszystkich procesów roboczych
+            rejected, received, connections, active = (
+                self.shared_state.total(field)
+                for field in (JOBS_REJECTED, BYTES_RECEIVED, CONNECTIONS, ACTIVE_CONNECTIONS)
+            )
         else:
-            # Inne komendy - symulacja pozytywnej odpowiedzi
-            return "OK\n"
+            rejected = self.jobs_rejected.value()
+            received = self.bytes_received.value()
+            connections = self.connections_total.value()
+            active = self.active_connections
+
+        writer.family('printer_available', 'gauge', 'Whether the printer accepts jobs (1) or not (0).')
+        writer.sample('printer_available', 1 if self.current_status in AVAILABLE_STATUSES else 0, labels)
+
+        writer.family('zebra_jobs', 'counter', 'Print jobs completed.')
+        writer.sample('zebra_jobs_total', self.total_jobs_printed, labels)
+
+        writer.family('zebra_labels', 'counter', 'Labels printed including ^PQ copies.')
+        writer.sample('zebra_labels_total', self.total_labels_printed, labels)
+
+        writer.family('zebra_label_pauses', 'counter', 'Pause-and-cut stops requested by ^PQ.')
+        writer.sample('zebra_label_pauses_total', self.label_pauses, labels)
+
+        writer.family('zebra_commands', 'counter', 'ZPL commands processed by mnemonic.')
+        for mnemonic, count in sorted(self.command_counter.snapshot().items()):
+            writer.sample('zebra_commands_total', count, dict(labels, mnemonic=mnemonic))
+
+        writer.family('zebra_unknown_commands', 'counter', 'Unrecognized ZPL commands by mnemonic.')
+        for mnemonic, count in sorted(self.unknown_commands.snapshot().items()):
+            writer.sample('zebra_unknown_commands_total', count, dict(labels, mnemonic=mnemonic))
+
+        writer.family('zebra_rejected_jobs', 'counter', 'Jobs rejected because the receive buffer was full.')
+        writer.sample('zebra_rejected_jobs_total', rejected, labels)
+
+        writer.family('zebra_print_queue_depth', 'gauge', 'Jobs waiting in the receive buffer including the one printing.')
+        writer.sample('zebra_print_queue_depth', self.queue_depth, labels)
+
+        writer.family('zebra_received_bytes', 'counter', 'Bytes received on the ZPL socket.')
+        writer.sample('zebra_received_bytes_total', received, labels)
+
+        writer.family('zebra_http_batches', 'counter', 'ZPL batches submitted with POST /pstprnt.')
+        writer.sample('zebra_http_batches_total', self.http_batches.value(), labels)
+
+        writer.family('zebra_http_received_bytes', 'counter', 'ZPL bytes received through POST /pstprnt.')
+        writer.sample('zebra_http_received_bytes_total', self.http_bytes_received.value(), labels)
+
+        writer.family('zebra_connections', 'counter', 'Accepted ZPL socket connections.')
+        writer.sample('zebra_connections_total', connections, labels)
+
+        writer.family('zebra_active_connections', 'gauge', 'Currently open ZPL socket connections.')
+        writer.sample('zebra_active_connections', active, labels)
+
+        writer.family('zebra_idle_connections_reaped', 'counter', 'Connections closed after the idle timeout.')
+        writer.sample('zebra_idle_connections_reaped_total', self.idle_connections_reaped.value(), labels)
+
+        store = self.format_store
+        writer.family('zebra_stored_formats', 'gauge', 'Formats stored with ^DF.')
+        writer.sample('zebra_stored_formats', len(store), labels)
+
+        writer.family('zebra_stored_format_bytes', 'gauge', 'Memory used by stored formats.')
+        writer.sample('zebra_stored_format_bytes', store.bytes_used, labels)
+
+        writer.family('zebra_stored_format_lookups', 'counter', 'Stored format recalls (^XF) by result.')
+        writer.sample('zebra_stored_format_lookups_total', store.hits, dict(labels, result='hit'))
+        writer.sample('zebra_stored_format_lookups_total', store.misses, dict(labels, result='miss'))
+
+        writer.family('zebra_stored_format_evictions', 'counter', 'Stored formats evicted to stay within the memory limit.')
+        writer.sample('zebra_stored_format_evictions_total', store.evictions, labels)
+
+        writer.family('zebra_stored_format_expanded_bytes', 'counter', 'Template bytes expanded by ^XF instead of being sent.')
+        writer.sample('zebra_stored_format_expanded_bytes_total', store.expanded_bytes, labels)
+
+        graphics = self.graphic_store
+        writer.family('zebra_graphics_decoded', 'counter', 'Graphics (~DG, ^GF) decoded and stored.')
+        writer.sample('zebra_graphics_decoded_total', graphics.decoded, labels)
+
+        writer.family('zebra_graphic_errors', 'counter', 'Graphics rejected by reason (crc_mismatch, overflow, too_large, ...).')
+        for reason, count in sorted(graphics.errors.items()):
+            writer.sample('zebra_graphic_errors_total', count, dict(labels, reason=reason))
+
+        writer.family('zebra_graphic_store_bytes', 'gauge', 'Memory used by decoded graphics by kind (~DG named, ^GF inline).')
+        writer.sample('zebra_graphic_store_bytes', graphics.bytes_used, dict(labels, kind='named'))
+        writer.sample('zebra_graphic_store_bytes', graphics.inline.bytes_used, dict(labels, kind='inline'))
+
+        if self.previews is not None:
+            previews = self.previews
+            writer.family('zebra_preview_cache_bytes', 'gauge', 'Memory used by labels kept for previews and rendered PNGs.')
+            writer.sample('zebra_preview_cache_bytes', previews.bytes_used, labels)
+
+            writer.family('zebra_preview_renders', 'counter', 'Preview requests by result (hit = cached PNG, miss = rendered).')
+            writer.sample('zebra_preview_renders_total', previews.hits, dict(labels, result='hit'))
+            writer.sample('zebra_preview_renders_total', previews.misses, dict(labels, result='miss'))
+
+        writer.family('zebra_command_duration_seconds', 'histogram', 'Time spent processing one ZPL frame.')
+        writer.histogram('zebra_command_duration_seconds', self.command_latency, labels)
 
     def get_printer_config(self):
         config = {
             'name': self.name,
             'model': self.model,
-            'dpi': '203',
-            'width': '4.00',
-            'length': '6.00',
+            'dpi': str(self.dpi),
+            'width': f"{self.label_width:.2f}",
+            'length': f"{self.label_length:.2f}",
             'darkness': '10',
-            'speed': '2'
+            'speed': f"{self.print_speed:g}"
         }
         return json.dumps(config) + "\n"
 
     def start_socket_server(self):
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.worker_index is not None:
+            # Jądro rozdziela nowe połączenia między procesy robocze nasłuchujące na tym samym porcie
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 
         try:
             server_socket.bind((self.host, self.port))
-            server_socket.listen(5)
+            server_socket.listen(self.backlog)
             logger.info(f"ZEBRA Mock {self.name} listening on {self.host}:{self.port}")
 
             while True:
@@ -135,90 +1014,142 @@ class ZebraPrinterMock:
         finally:
             server_socket.close()
 
+    async def create_async_server(self):
+        server = await asyncio.start_server(
+            self.handle_client_async,
+            self.host,
+            self.port,
+            backlog=self.backlog,
+            reuse_address=True,
+            reuse_port=self.worker_index is not None
+        )
+        logger.info(f"ZEBRA Mock {self.name} listening on {self.host}:{self.port} (asyncio)")
+        return server
+
+    async def serve_async(self):
+        server = await self.create_async_server()
+        async with server:
+            await server.serve_forever()
+
+    def start_async_socket_server(self):
+        raise_nofile_limit()
+        try:
+            asyncio.run(self.serve_async())
+        except Exception as e:
+            logger.error(f"Socket server error: {e}")
+
     def start_web_server(self):
-        port = int(self.web_app.config.get('PORT', 8080))
-        self.web_app.run(host='0.0.0.0', port=port, debug=False)
+        from web_interface import serve_web_app
+        serve_web_app(self, int(self.web_app.config.get('PORT', 8080)))
+
+    def socket_server_target(self):
+        if self.server_mode == 'asyncio':
+            return self.start_async_socket_server
+        return self.start_socket_server
 
     def start(self):
-        # Start socket server in separate thread
-        socket_thread = threading.Thread(target=self.start_socket_server)
-        socket_thread.daemon = True
-        socket_thread.start()
+        if self.headless:
+            # Bez HTTP serwer socket działa w wątku głównym; proces nadrzędny --workers tylko czeka
+            if self.shared_state is None:
+                self.socket_server_target()()
+            for process in multiprocessing.active_children():
+                process.join()
+            return
+
+        # Start socket server in separate thread (port 9100 obsługują wtedy procesy robocze)
+        if self.shared_state is None:
+            socket_thread = threading.Thread(target=self.socket_server_target())
+            socket_thread.daemon = True
+            socket_thread.start()
 
         # Start web server (blocking)
         self.start_web_server()
 
+    def shutdown(self):
+        """Zatrzymanie procesu - reszta bufora nagrania ruchu trafia na dysk"""
+        if self.capture:
+            self.capture.close()
 
-# HTML template for web interface
-WEB_INTERFACE_TEMPLATE = '''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>ZEBRA Printer Mock - {{ printer.name }}</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 20px; }
-        .status { padding: 10px; border-radius: 5px; margin: 10px 0; }
-        .ready { background-color: #d4edda; color: #155724; }
-        .printing { background-color: #fff3cd; color: #856404; }
-        .error { background-color: #f8d7da; color: #721c24; }
-        .info-box { border: 1px solid #ddd; padding: 15px; margin: 10px 0; border-radius: 5px; }
-        button { padding: 10px 20px; margin: 5px; cursor: pointer; }
-    </style>
-    <script>
-        function refreshStatus() {
-            fetch('/api/status')
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('status').innerText = data.status;
-                    document.getElementById('jobs').innerText = data.jobs_printed;
-                    document.getElementById('lastCommand').innerText = data.last_command || 'None';
-                    document.getElementById('timestamp').innerText = data.timestamp;
-                });
-        }
 
-        function resetPrinter() {
-            fetch('/api/reset', {method: 'POST'})
-                .then(() => refreshStatus());
-        }
+def exit_on_sigterm():
+    """SIGTERM (docker stop, zamykanie procesów roboczych) jako SystemExit - wykonują się bloki finally"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+
+def start_workers(workers, printer_options):
+    """Uruchamia `workers` procesów obsługujących port 9100 przez SO_REUSEPORT
+
+    Procesy tworzone są przez fork przed startem jakichkolwiek wątków.
+    Zwraca SharedPrinterState, z którego proces nadrzędny czyta zagregowany stan.
+    """
+    context = multiprocessing.get_context('fork')
+    # Dziennik obiektów mieści zawartość obu pamięci - ^DF i ~DG widoczne we wszystkich procesach
+    journal_bytes = (
+        printer_options.get('format_store_size', DEFAULT_STORE_BYTES)
+        + printer_options.get('graphic_store_size', DEFAULT_GRAPHIC_STORE_BYTES)
+    )
+    shared_state = SharedPrinterState(workers, context, journal_bytes=journal_bytes)
+    for worker_index in range(workers):
+        process = context.Process(
+            target=run_worker,
+            args=(printer_options, shared_state, worker_index),
+            name=f"zebra-worker-{worker_index}",
+            daemon=True
+        )
+        process.start()
+    logger.info(f"Started {workers} worker processes on port {printer_options.get('port', 9100)}")
+    return shared_state
+
+
+def run_worker(printer_options, shared_state, worker_index):
+    options = dict(printer_options)
+    if options.get('capture_file'):
+        # Osobny plik na proces - rekordy z wielu procesów nie przeplatają się
+        options['capture_file'] = f"{options['capture_file']}.{worker_index}"
+    exit_on_sigterm()
+    printer = ZebraPrinterMock(**options, shared_state=shared_state, worker_index=worker_index)
+    printer.publish_state()
+    try:
+        printer.socket_server_target()()
+    finally:
+        printer.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='ZEBRA printer mock')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=int(os.getenv('PRINTER_WORKERS', '1')),
+        help='Processes sharing the ZPL port via SO_REUSEPORT'
+    )
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        default=os.getenv('PRINTER_HEADLESS', '').lower() in ('1', 'true', 'yes'),
+        help='Serve only the ZPL port, without importing or starting the web interface'
+    )
+    return parser.parse_args()
+
+
+def parse_number(params):
+    """Pierwszy parametr komendy ZPL jako liczba (None, gdy brak lub niepoprawny)"""
+    value = params.split(b',', 1)[0].strip()
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def raise_nofile_limit():
+    # Tysiące równoczesnych połączeń wymagają podniesienia limitu deskryptorów
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not raise open file limit: {e}")
 
-        setInterval(refreshStatus, 5000);
-        window.onload = refreshStatus;
-    </script>
-</head>
-<body>
-    <h1>ZEBRA Printer Mock: {{ printer.name }}</h1>
-
-    <div class="info-box">
-        <h3>Printer Information</h3>
-        <p><strong>Name:</strong> {{ printer.name }}</p>
-        <p><strong>Model:</strong> {{ printer.model }}</p>
-        <p><strong>Socket Port:</strong> 9100</p>
-        <p><strong>Web Port:</strong> 8080</p>
-    </div>
-
-    <div class="info-box">
-        <h3>Current Status</h3>
-        <p><strong>Status:</strong> <span id="status">{{ printer.status }}</span></p>
-        <p><strong>Jobs Printed:</strong> <span id="jobs">{{ printer.jobs_printed }}</span></p>
-        <p><strong>Last Command:</strong> <span id="lastCommand">{{ printer.last_command or 'None' }}</span></p>
-        <p><strong>Last Update:</strong> <span id="timestamp"></span></p>
-    </div>
-
-    <div class="info-box">
-        <h3>Actions</h3>
-        <button onclick="refreshStatus()">Refresh Status</button>
-        <button onclick="resetPrinter()">Reset Printer</button>
-    </div>
-
-    <div class="info-box">
-        <h3>Test Commands</h3>
-        <p>You can test the printer using telnet or netcat:</p>
-        <code>telnet {{ printer.name }} 9100</code><br>
-        <code>echo "~HI" | nc {{ printer.name }} 9100</code>
-    </div>
-</body>
-</html>
-'''
 
 # Main execution
 if __name__ == '__main__':
@@ -227,14 +1158,42 @@ if __name__ == '__main__':
     socket_port = int(os.getenv('PRINTER_SOCKET_PORT', '9101'))
     web_port = int(os.getenv('FLASK_RUN_PORT', '8081'))
     
-    printer = ZebraPrinterMock(
+    args = parse_args()
+    printer_options = dict(
         name=printer_name,
         model=printer_model,
-        port=socket_port
+        port=socket_port,
+        server_mode=os.getenv('PRINTER_SERVER_MODE', 'threaded'),
+        max_connections=int(os.getenv('PRINTER_MAX_CONNECTIONS', '10000')),
+        backlog=int(os.getenv('PRINTER_BACKLOG', '1024')),
+        print_engine=os.getenv('PRINTER_PRINT_ENGINE', 'instant'),
+        job_queue_size=int(os.getenv('PRINTER_JOB_QUEUE_SIZE', '64')),
+        job_history_size=int(os.getenv('PRINTER_JOB_HISTORY_SIZE', str(DEFAULT_CAPACITY))),
+        capture_file=os.getenv('PRINTER_CAPTURE_FILE') or None,
+        fault_profile=load_profile_setting(os.getenv('PRINTER_FAULT_PROFILE')),
+        connection_mode=os.getenv('PRINTER_CONNECTION_MODE', 'keepalive'),
+        idle_timeout=float(os.getenv('PRINTER_IDLE_TIMEOUT', '0')),
+        format_store_size=int(os.getenv('PRINTER_FORMAT_STORE_SIZE', str(DEFAULT_STORE_BYTES))),
+        graphic_store_size=int(os.getenv('PRINTER_GRAPHIC_STORE_SIZE', str(DEFAULT_GRAPHIC_STORE_BYTES))),
+        preview_cache_size=int(os.environ['PRINTER_PREVIEW_CACHE_SIZE']) if os.getenv('PRINTER_PREVIEW_CACHE_SIZE') else None,
+        web_server=os.getenv('PRINTER_WEB_SERVER', 'waitress'),
+        web_threads=int(os.getenv('PRINTER_WEB_THREADS', str(DEFAULT_WEB_THREADS))),
+        headless=args.headless
     )
+
+    exit_on_sigterm()
+    if args.workers > 1:
+        shared_state = start_workers(args.workers, printer_options)
+        printer = ZebraPrinterMock(**dict(printer_options, capture_file=None), shared_state=shared_state)
+    else:
+        printer = ZebraPrinterMock(**printer_options)
     
     # Override web port
-    printer.web_app.config['PORT'] = web_port
+    if printer.web_app is not None:
+        printer.web_app.config['PORT'] = web_port
     
     print(f"Starting {printer_name} on socket port {socket_port} and web port {web_port}")
-    printer.start()
\ No newline at end of file
+    try:
+        printer.start()
+    finally:
+        printer.shutdown()
\ No newline at end of file
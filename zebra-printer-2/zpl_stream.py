@@ -0,0 +1,274 @@
+# zebra-printer-2/zpl_stream.py
+# Przyrostowy parser strumienia ZPL odbieranego na porcie 9100
+import re
+
+FORMAT_START = b'^XA'
+FORMAT_END = b'^XZ'
+CONTROL_PREFIXES = b'^~'
+
+FRAME_FORMAT = 'format'
+FRAME_HOST = 'host'
+
+# Komendy z danymi grafiki i liczba pól nagłówka przed danymi (~DGnazwa,t,w, / ^GFa,b,c,d,)
+GRAPHIC_DOWNLOAD = b'~DG'
+GRAPHIC_FIELD = b'^GF'
+GRAPHIC_HEADER_FIELDS = {GRAPHIC_DOWNLOAD: 3, GRAPHIC_FIELD: 4}
+MAX_GRAPHIC_HEADER = 128
+
+CONTROL_PATTERN = re.compile(rb'[\^~]')
+LINE_ENDS = b'\r\n'
+
+# Komendy hosta bez parametrów - kompletne zaraz po mnemoniku, bez końca linii
+COMPLETE_HOST_COMMANDS = frozenset((
+    b'~HS', b'~HI', b'~HM', b'~HD', b'~HB', b'~JA', b'~JR', b'~PP', b'~PS', b'~WC', b'^HH'
+))
+
+
+class GraphicScan:
+    """Najbliższe wystąpienia ^GF i ~DG w buforze w trakcie jednego wywołania feed()
+
+    Każda komenda wyszukiwana jest przez bytes.find i ponownie dopiero wtedy,
+    gdy pozycja przetwarzania ją minie - zwykłe etykiety bez grafik kosztują
+    po jednym przeszukaniu bufora na komendę, a nie na format.
+    """
+
+    __slots__ = ('_buf', '_field', '_download')
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._field = -2
+        self._download = -2
+
+    def next(self, start, limit, host=False):
+        """(komenda, pozycja) najbliższej grafiki przed limit (-1 = bez ograniczenia) albo None"""
+        download = self._download
+        if download == -2 or 0 <= download < start:
+            download = self._download = self._buf.find(GRAPHIC_DOWNLOAD, start)
+        best = (GRAPHIC_DOWNLOAD, download) if download >= 0 else None
+
+        if not host:
+            field = self._field
+            if field == -2 or 0 <= field < start:
+                field = self._field = self._buf.find(GRAPHIC_FIELD, start)
+            if field >= 0 and (best is None or field < download):
+                best = (GRAPHIC_FIELD, field)
+
+        if best is None or (0 <= limit < best[1]):
+            return None
+        return best
+
+
+class ZplStreamParser:
+    """Wyodrębnia kompletne formaty ^XA...^XZ i komendy hosta z dowolnie pociętego strumienia bajtów.
+
+    Dane są dopisywane do jednego bufora, a wyszukiwanie końca formatu
+    kontynuowane jest od miejsca, w którym skończyło się poprzednio, więc
+    każdy bajt jest przeglądany tylko raz niezależnie od podziału na pakiety.
+
+    Z graphic_sink (np. GraphicStore) dane ~DG/^GF nie są buforowane: po
+    nagłówku parser przekazuje je fragmentami do dekodera aż do następnego
+    ^ lub ~ (albo zadeklarowanej liczby bajtów dla danych binarnych), a w
+    ramce zostaje nagłówek i odwołanie zwrócone przez graphic_sink.finish().
+    """
+
+    def __init__(self, graphic_sink=None):
+        self._buffer = bytearray()
+        self._in_format = False
+        self._scan_pos = 0
+        self._graphic_sink = graphic_sink
+        self._graphic = None
+        self._graphic_remaining = None
+        self._graphic_frame = None
+        # Początek formatu przeniesiony z bufora przed danymi grafiki
+        self._format_head = bytearray()
+        self.formats_seen = 0
+
+    @property
+    def in_format(self):
+        return self._in_format
+
+    @property
+    def pending_bytes(self):
+        return len(self._buffer) + len(self._format_head)
+
+    def feed(self, data):
+        """Dopisuje fragment danych i zwraca listę kompletnych ramek (rodzaj, bajty)"""
+        buf = self._buffer
+        buf.extend(data)
+        frames = []
+        pos = 0
+        # Pozycje najbliższych ^GF / ~DG liczone raz i odświeżane dopiero po ich minięciu
+        graphics = GraphicScan(buf) if self._graphic_sink is not None else None
+
+        while True:
+            if self._graphic is not None:
+                pos = self._feed_graphic(frames, buf, pos)
+                if self._graphic is not None:
+                    break
+                self._scan_pos = pos
+                continue
+
+            if self._in_format:
+                end = buf.find(FORMAT_END, self._scan_pos)
+                graphic = graphics.next(self._scan_pos, end) if graphics else None
+                if graphic is not None:
+                    header_end = self._start_graphic(buf, *graphic)
+                    if header_end is None:
+                        break
+                    if header_end < 0:
+                        self._scan_pos = graphic[1] + len(graphic[0])
+                        continue
+                    # Początek formatu razem z nagłówkiem grafiki - dane pójdą do dekodera
+                    self._format_head += buf[pos:header_end]
+                    pos = header_end
+                    continue
+
+                if end < 0:
+                    # ^XZ może zaczynać się w dwóch ostatnich bajtach bufora
+                    self._scan_pos = max(self._scan_pos, len(buf) - len(FORMAT_END) + 1)
+                    break
+
+                end += len(FORMAT_END)
+                # Jedna kopia ramki - widok zamiast wycinka bytearray
+                with memoryview(buf) as view:
+                    if self._format_head:
+                        frame = b''.join((self._format_head, view[pos:end]))
+                        self._format_head.clear()
+                    else:
+                        frame = bytes(view[pos:end])
+                frames.append((FRAME_FORMAT, frame))
+                self.formats_seen += 1
+                self._in_format = False
+                pos = end
+                continue
+
+            # Niezakończony tekst hosta z poprzedniego wywołania był już przeszukany
+            scan = max(pos, self._scan_pos - len(FORMAT_START) + 1)
+            start = buf.find(FORMAT_START, scan)
+            graphic = graphics.next(scan, start, host=True) if graphics else None
+            if graphic is not None:
+                command, graphic_start = graphic
+                self._append_host(frames, buf, pos, graphic_start)
+                pos = graphic_start
+                header_end = self._start_graphic(buf, command, graphic_start)
+                if header_end is None:
+                    self._scan_pos = pos
+                    break
+                if header_end >= 0:
+                    self._graphic_frame = bytes(buf[graphic_start:header_end])
+                    pos = header_end
+                    continue
+                # Niepoprawny nagłówek ~DG - komenda przekazywana jako zwykły tekst hosta
+                self._append_host(frames, buf, graphic_start, graphic_start + len(command))
+                pos = graphic_start + len(command)
+                continue
+
+            if start < 0:
+                cut = self._host_cut(buf, pos, scan)
+                self._append_host(frames, buf, pos, cut)
+                pos = cut
+                self._scan_pos = len(buf)
+                break
+
+            self._append_host(frames, buf, pos, start)
+            self._in_format = True
+            pos = start
+            self._scan_pos = start + len(FORMAT_START)
+
+        # Usunięcie przetworzonego prefiksu - bytearray robi to bez kopiowania reszty
+        del buf[:pos]
+        self._scan_pos = max(self._scan_pos - pos, 0)
+        return frames
+
+    def flush(self):
+        """Zwraca niedokończone komendy hosta po zamknięciu połączenia; niedokończony format jest odrzucany"""
+        frames = []
+        if self._graphic is not None:
+            self._graphic.feed(self._buffer)
+            self._buffer.clear()
+            self._end_graphic(frames)
+        if not self._in_format:
+            self._append_host(frames, self._buffer, 0, len(self._buffer))
+        self.reset()
+        return frames
+
+    def reset(self):
+        self._buffer.clear()
+        self._format_head.clear()
+        self._in_format = False
+        self._scan_pos = 0
+        self._graphic = None
+        self._graphic_remaining = None
+        self._graphic_frame = None
+
+    def _start_graphic(self, buf, command, start):
+        """Tworzy dekoder dla ~DG/^GF; zwraca koniec nagłówka, None gdy nagłówek jest niepełny, -1 gdy to nie grafika"""
+        header_start = start + len(command)
+        pos = header_start
+        for _ in range(GRAPHIC_HEADER_FIELDS[command]):
+            comma = buf.find(b',', pos, header_start + MAX_GRAPHIC_HEADER)
+            control = CONTROL_PATTERN.search(buf, pos, comma if comma >= 0 else len(buf))
+            if control is not None:
+                return -1
+            if comma < 0:
+                return None if len(buf) - header_start < MAX_GRAPHIC_HEADER else -1
+            pos = comma + 1
+
+        decoder = self._graphic_sink.begin(command, bytes(buf[header_start:pos]))
+        if decoder is None:
+            return -1
+        self._graphic = decoder
+        self._graphic_remaining = decoder.expected_bytes
+        return pos
+
+    def _feed_graphic(self, frames, buf, pos):
+        decoder = self._graphic
+        if self._graphic_remaining is not None:
+            end = min(len(buf), pos + self._graphic_remaining)
+            self._graphic_remaining -= end - pos
+            complete = self._graphic_remaining == 0
+        else:
+            control = CONTROL_PATTERN.search(buf, pos)
+            complete = control is not None
+            end = control.start() if complete else len(buf)
+
+        if end > pos:
+            with memoryview(buf) as view:
+                decoder.feed(view[pos:end])
+        if complete:
+            self._end_graphic(frames)
+        return end
+
+    def _end_graphic(self, frames):
+        reference = self._graphic_sink.finish(self._graphic)
+        self._graphic = None
+        if self._in_format:
+            self._format_head += reference
+            return
+        frames.append((FRAME_HOST, self._graphic_frame + reference))
+        self._graphic_frame = None
+
+    @staticmethod
+    def _host_cut(buf, pos, scan):
+        """Koniec kompletnego tekstu hosta - reszta czeka na następny ^/~, koniec linii albo flush()
+
+        Ostatnia komenda może jeszcze dostać parametry (~HQE + S), więc jest
+        zatrzymywana, chyba że to komenda bez parametrów (~HS). Przed scan
+        zatrzymany tekst nie zawiera ani prefiksu (poza pierwszym bajtem), ani
+        końca linii, więc przeszukiwane są tylko nowe dane.
+        """
+        end = len(buf)
+        cut = max(pos, *(buf.rfind(prefix, scan) for prefix in CONTROL_PREFIXES))
+        cut = max(cut, *(buf.rfind(line_end, scan) + 1 for line_end in LINE_ENDS))
+        if end - cut <= 3 and bytes(buf[cut:end]).upper() in COMPLETE_HOST_COMMANDS:
+            return end
+        return cut
+
+    @staticmethod
+    def _append_host(frames, buf, start, end):
+        if end <= start:
+            return
+        with memoryview(buf) as view:
+            segment = bytes(view[start:end]).strip()
+        if segment:
+            frames.append((FRAME_HOST, segment))